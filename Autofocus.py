@@ -12,7 +12,8 @@ except ModuleNotFoundError:
 
 
 def laplacian(img):
-    img_gray = cv2.cvtColor(img,cv2.COLOR_RGB2GRAY)
+    # Frames from a GRAY8 pipeline are already single-channel
+    img_gray = img if img.ndim == 2 else cv2.cvtColor(img,cv2.COLOR_RGB2GRAY)
     img_sobel = np.abs(cv2.Laplacian(img_gray, cv2.CV_16S, ksize=3))
     return cv2.mean(img_sobel)[0]
 
@@ -97,26 +98,6 @@ def statsThread(camera, focuser, focusState):
 
         print("stats done.")
 
-# Most simple way, walk through the whole range and choose max position.
-'''
-def focusThread(focuser, focusState):
-    sharpnessList = []
-    while not exit_ and not focusState.isFinish():
-        position, sharpness = focusState.sharpnessList.get()
-        print("got stats data: {}, {}".format(position, sharpness))
-
-        if position == -1 and sharpness == -1:
-            break
-
-        sharpnessList.append((position, sharpness))
-    
-    focusState.setFinish()
-
-    maxItem = max(sharpnessList, key=lambda item:item[1])
-    print("max: {}".format(maxItem))
-    focuser.set(Focuser.OPT_FOCUS, maxItem[0])
-'''
-
 # Try to make it fast.
 def focusThread(focuser, focusState):
     sharpnessList = []
@@ -22,23 +22,80 @@ import socket
 from web_server import start_server
 from add_schrank import add_new_schrank
 from delete_schrank import delete_existing_schrank
-from database import DatabaseManager
+from database import get_default_db
 
 # Globale Status-Variablen
 server_running = False
 
-def get_local_ip():
-    """Ermittelt die echte WLAN/LAN IPv4-Adresse des Rechners."""
+# Zwischenspeicher für die ermittelte IP (wird nur einmal pro Programmlauf bestimmt)
+_local_ip = None
+
+SIOCGIFADDR = 0x8915 # Linux ioctl: IPv4-Adresse eines Interfaces abfragen
+
+def _scan_interfaces():
+    """
+    Liest die IPv4-Adressen der Netzwerk-Interfaces direkt vom Kernel (Linux).
+    Es wird kein Paket verschickt und keine DNS-Auflösung benötigt.
+    Rückgabe: Erste Nicht-Loopback-Adresse oder None.
+    """
+    try:
+        import fcntl
+        import struct
+    except ImportError:
+        return None # Kein fcntl (z.B. Windows) -> Fallback nutzen
+
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
-        # Baut eine Dummy-Verbindung auf
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
+        for _, name in socket.if_nameindex():
+            try:
+                packed = fcntl.ioctl(s.fileno(), SIOCGIFADDR, struct.pack('256s', name[:15].encode()))
+            except OSError:
+                continue # Interface ohne IPv4-Adresse (oder nicht aktiv)
+            ip = socket.inet_ntoa(packed[20:24])
+            if not ip.startswith("127."):
+                return ip
+    except OSError:
+        pass
+    finally:
         s.close()
-        return ip
-    except Exception:
-        # Fallback, falls der PC gar kein Netzwerk hat
-        return "127.0.0.1"
+    return None
+
+def get_local_ip():
+    """Ermittelt die echte WLAN/LAN IPv4-Adresse des Rechners."""
+    global _local_ip
+    if _local_ip is not None:
+        return _local_ip
+
+    # 1. Lokale Interfaces durchsuchen (funktioniert auch offline)
+    ip = _scan_interfaces()
+
+    if ip is None:
+        try:
+            # 2. Fallback: Baut eine Dummy-Verbindung auf
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.connect(("8.8.8.8", 80))
+            ip = s.getsockname()[0]
+            s.close()
+        except Exception:
+            # Fallback, falls der PC gar kein Netzwerk hat
+            ip = "127.0.0.1"
+
+    _local_ip = ip
+    return ip
+
+def wait_for_server(host="127.0.0.1", port=5000, timeout=2.0):
+    """
+    Wartet, bis der Server-Socket Verbindungen annimmt (Readiness-Check).
+    Rückgabe: True sobald der Port erreichbar ist, False nach Ablauf des Timeouts.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.05):
+                return True
+        except OSError:
+            time.sleep(0.01) # 10 ms Backoff bis zum nächsten Versuch
+    return False
 
 def start_server_in_thread():
     """
@@ -57,7 +114,9 @@ def start_server_in_thread():
         server_thread.start()
         
         server_running = True
-        time.sleep(1) # Kurzes Warten auf Socket-Bindung (UX-Optimierung)
+        # Warten, bis der Socket gebunden ist (statt einer festen Pause)
+        if not wait_for_server():
+            print("[WARNUNG] Server antwortet noch nicht, starte trotzdem weiter...")
         
         # NEU: Dynamische IP ermitteln und anzeigen
         wlan_ip = get_local_ip()
@@ -81,7 +140,7 @@ def main_menu():
     return input("Bitte wählen (1-3): ")
 
 def main():
-   """
+    """
     Hauptablauf: Initialisiert die Datenbank, startet den Webserver 
     und ruft abschließend die Endlosschleife für das CLI-Menü auf.
     """
@@ -89,7 +148,7 @@ def main():
 
     # ---------- 1. Persistenz-Layer Initialisierung ----------
     try:
-        db = DatabaseManager()
+        db = get_default_db()
         db.create_schrank_table()
         print("[INIT] Datenbank-Integrität geprüft.")
     except Exception as e:
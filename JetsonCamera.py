@@ -6,11 +6,6 @@ import cv2
 import threading
 import time
 
-try:
-    from Queue import Queue
-except ModuleNotFoundError:
-    from queue import Queue
-
 def gstreamer_pipeline(
     capture_width=3840,
     capture_height=2160,
@@ -18,47 +13,71 @@ def gstreamer_pipeline(
     display_height=1440,
     framerate=17,
     flip_method=0,
+    gray=False,
 ):
-    return (
+    # gray=True: nvvidconv scales and converts to GRAY8 on the GPU, so only the
+    # small mono buffer is copied into Python (no videoconvert on the CPU).
+    if gray:
+        output = "video/x-raw, width=(int)%d, height=(int)%d, format=GRAY8 ! "
+    else:
+        output = (
+            "video/x-raw, width=(int)%d, height=(int)%d, format=BGRx ! "
+            "videoconvert ! "
+            "video/x-raw, format=BGR ! "
+        )
+    pipeline = (
         "nvarguscamerasrc sensor-id=0 exposurecompensation=-0.5 ! "
         "video/x-raw(memory:NVMM), width=(int)%d, height=(int)%d, format=NV12, framerate=(fraction)%d/1 ! "
         "nvvidconv flip-method=%d ! "
-        "video/x-raw, width=(int)%d, height=(int)%d, format=BGRx ! "
-        "videoconvert ! "
-        "video/x-raw, format=BGR ! appsink sync=false drop=true"
-        % (
-            capture_width,
-            capture_height,
-            framerate,
-            flip_method,
-            display_width,
-            display_height,
-        )
+        + output +
+        "appsink sync=false drop=true"
+    )
+    return pipeline % (
+        capture_width,
+        capture_height,
+        framerate,
+        flip_method,
+        display_width,
+        display_height,
     )
 
 class FrameReader(threading.Thread):
-    queues = []
     _running = True
     camera = None
     def __init__(self, camera, name):
         threading.Thread.__init__(self)
         self.name = name
         self.camera = camera
+        # Double buffer: read() decodes into the back buffer (no allocation per frame),
+        # then front and back are swapped. _frameId counts captured frames so every
+        # waiting consumer gets the next new frame.
+        self._front = None
+        self._back = None
+        self._frameId = 0
+        self._cond = threading.Condition(threading.Lock())
  
     def run(self):
         while self._running:
-            _, frame = self.camera.read()
-            while self.queues:
-                queue = self.queues.pop()
-                queue.put(frame)
-    
-    def addQueue(self, queue):
-        self.queues.append(queue)
+            ok, frame = self.camera.read(self._back)
+            if not ok:
+                frame = None
+            with self._cond:
+                self._back, self._front = self._front, frame
+                self._frameId += 1
+                self._cond.notify_all()
 
     def getFrame(self, timeout = None):
-        queue = Queue(1)
-        self.addQueue(queue)
-        return queue.get(timeout = timeout)
+        # Returns a read-only view of the next captured frame, or None if none arrived
+        # within timeout. The buffer is reused two frames later: copy it if it must live longer.
+        with self._cond:
+            lastId = self._frameId
+            if not self._cond.wait_for(lambda: self._frameId != lastId, timeout):
+                return None
+            if self._front is None:
+                return None
+            view = self._front.view()
+            view.flags.writeable = False
+            return view
 
     def stop(self):
         self._running = False
@@ -89,17 +108,19 @@ class Camera(object):
     cap = None
     previewer = None
 
-    def __init__(self, width=2560, height=1440):
-        self.open_camera(width, height)
+    def __init__(self, width=2560, height=1440, gray=False, flip_method=0):
+        self.open_camera(width, height, gray, flip_method)
 
-    def open_camera(self, width=2560, height=1440):
+    def open_camera(self, width=2560, height=1440, gray=False, flip_method=0):
+        # flip_method is applied by nvvidconv on the GPU (2 = rotate 180 degrees)
         pipeline = gstreamer_pipeline(
             capture_width=3840, 
             capture_height=2160,
             display_width=width, 
             display_height=height,
             framerate=17, 
-            flip_method=0 
+            flip_method=flip_method,
+            gray=gray
         )
         print(f"GStreamer Pipeline: {pipeline}")
 
@@ -21,7 +21,7 @@ Design-Notizen
 """
 
 from schrank import Schrank
-from database import DatabaseManager
+from database import get_default_db
 from qr_generator import QRCodeGenerator
 
 def add_new_schrank():
@@ -48,7 +48,7 @@ def add_new_schrank():
     
     try:
         # ---------- 3. Datenbank-Verbindung & Speichern ----------
-        db_manager = DatabaseManager()
+        db_manager = get_default_db()
         
         print(f"Versuche '{ware}' in die Datenbank zu schreiben...")
         new_id = db_manager.insert_schrank(neuer_schrank)
@@ -59,7 +59,8 @@ def add_new_schrank():
             # ---------- 4. QR-Code Generierung ----------
             # Erst jetzt, da wir die ID haben, können wir den Code backen.
             qr_gen = QRCodeGenerator()
-            filepath = qr_gen.create_qr_for_schrank(new_id)
+            filepath = qr_gen.create_qr_for_schrank(new_id).result()
+            qr_gen.close()
             
             print(f"QR-Code generiert und gespeichert: {filepath}")
             print("   (Diesen Code bitte ausdrucken und am Warenträger anbringen)")
@@ -25,9 +25,6 @@ import os
 # Ermittelt den absoluten Pfad des Ordners, in dem diese Datei liegt.
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Datenbank-Datei für persistente QR-Code Zustände (JSON-basiert im Prototyp)
-JSON_FILE = os.path.join(BASE_DIR, "active_qrcodes.json")
-
 # Bilddatei des Lager-Layouts für die Vogelperspektive
 MAP_FILE = os.path.join(BASE_DIR, "grundriss.png")
 
@@ -51,6 +48,7 @@ CAM_FPS = 17
 # Skalierungsfaktor für die Bildverarbeitung.
 # 0.5 bedeutet: Wir rechnen auf 1280x720. 
 # Das vervierfacht die Geschwindigkeit der QR-Erkennung (pyzbar).
+# Die Verkleinerung (und Graustufen-Wandlung) übernimmt die GPU in der GStreamer-Pipeline.
 SCALE_FACTOR = 0.5       
 
 # "Kill Zone" am Bildrand [in Pixeln].
@@ -58,20 +56,42 @@ SCALE_FACTOR = 0.5
 # Verhindert, dass halb abgeschnittene Codes fehlerhaft getrackt werden.
 BORDER_MARGIN = 100      
 
+# Bewegungs-Erkennung vor dem QR-Scan.
+# Jeder Frame wird auf 64x36 Pixel verkleinert und mit dem zuletzt dekodierten
+# Frame verglichen. Liegt die mittlere Helligkeitsänderung unter der Schwelle,
+# wird das letzte Scan-Ergebnis wiederverwendet (spart den teuren pyzbar-Aufruf).
+MOTION_GRID = (64, 36)
+MOTION_THRESHOLD = 1.5
+# [Frames] Spätestens nach so vielen übersprungenen Frames wird neu gescannt.
+MOTION_REFRESH_FRAMES = 17
+
+# Nur jeder N-te Kamera-Frame wird an den QR-Decoder übergeben (1 = jeder Frame).
+# Die übrigen Frames werden nur angezeigt.
+DECODE_EVERY = 1
+
+# Scan-Bereich (ROI) als (x0, y0, x1, y1) in Pixeln der vollen Kamera-Auflösung.
+# Nur dieser Ausschnitt wird an den QR-Decoder übergeben (weniger Pixel für ZBar).
+# None = ganzes Bild. Hinweis: Die Kill-Zone (BORDER_MARGIN) bezieht sich weiterhin
+# auf den Bildrand; Objekte, die nur die ROI verlassen, gehen per Timeout verloren.
+SCAN_ROI = None
+
+# QR-Decoder: "zbar" (Standard) oder "wechat" (WeChatQRCode aus opencv-contrib).
+# Bei "wechat" springt ZBar ein, wenn WeChat nichts findet oder nicht installiert ist.
+QR_BACKEND = "zbar"
+# Ordner mit den WeChat-Modellen (detect/sr .prototxt + .caffemodel), None = ohne CNN
+WECHAT_MODEL_DIR = None
+
 
 # ==========================================
 # 4. TRACKING LOGIK (Verhalten)
 # ==========================================
-# [Frames] Kurzzeitgedächtnis (Debouncing).
-# Wie viele Frames darf ein Code unsichtbar sein (z.B. durch Lichtreflexion),
+# [Sekunden] Kurzzeitgedächtnis (Debouncing).
+# Wie lange darf ein Code unsichtbar sein (z.B. durch Lichtreflexion),
 # bevor er als "verloren" markiert wird?
-# 15 Frames bei 17 FPS ~= knapp 1 Sekunde Toleranz.
-MEMORY_TOLERANCE = 15       
-
-# [Pixel] Maximale Sprungdistanz pro Frame.
-# Wenn sich ein Code weiter als 300px bewegt, wird er als NEUES Objekt betrachtet.
-# Verhindert ID-Swapping zwischen zwei schnell passierenden Boxen.
-MAX_TRACKING_DISTANCE = 300 
+# Zeitbasiert statt in Frames: Wie viele Ergebnisse der Decoder pro Sekunde liefert,
+# hängt von ZBar, dem Bewegungs-Gate und DECODE_EVERY ab.
+# 0.9 s entspricht den früheren 15 Frames bei 17 FPS.
+MEMORY_TIMEOUT = 0.9
 
 
 # ==========================================
@@ -82,7 +102,11 @@ MAX_TRACKING_DISTANCE = 300
 # wieder auftaucht, behält er seine alte ID.
 HISTORY_DURATION = 10.0     
 
-# [Pixel] Erweiterter Suchradius für die Wiederbelebung.
-# Darf größer sein als MAX_TRACKING_DISTANCE, da in 10 Sekunden 
-# eine größere Strecke zurückgelegt werden kann.
-RECOVERY_DISTANCE = 500
+
+# ==========================================
+# 6. LIVE-STATUS (Tabelle 'qr_state')
+# ==========================================
+# [Sekunden] Mindestabstand zwischen zwei Status-Schreibvorgängen.
+# Die GUIs brauchen nur ~2 Updates pro Sekunde. Kommen Objekte hinzu oder
+# fallen weg, wird trotzdem sofort geschrieben.
+STATE_FLUSH_INTERVAL = 0.5
@@ -5,7 +5,8 @@ Analysesoftware zur Visualisierung von Bewegungsdaten (Heatmap).
 Zweck
 -----
 Dieses Modul generiert eine grafische Auswertung der historischen Tracking-Daten:
-1. Daten-Extraktion: Lädt alle gespeicherten Koordinaten aus der SQLite-Datenbank.
+1. Daten-Extraktion: Lädt die Anzahl der Einträge pro Koordinate blockweise aus der
+   SQLite-Datenbank (die Zählung übernimmt SQLite per GROUP BY).
 2. Aggregation: Addiert Bewegungen auf einer 2D-Maske (Accumulator-Prinzip).
    Häufig frequentierte Bereiche werden "heißer" (höhere Werte).
 3. Visualisierung: Legt eine Falschfarben-Darstellung (Jet-Colormap) über den 
@@ -13,9 +14,14 @@ Dieses Modul generiert eine grafische Auswertung der historischen Tracking-Daten
 
 Design-Notizen
 --------------
-- Datentyp Float32: Der Accumulator nutzt `float32` statt `uint8`. Das ist zwingend 
-  nötig, da an stark frequentierten Stellen der Wert schnell über 255 steigen würde 
-  (Overflow). Erst ganz am Ende wird auf 0-255 normalisiert.
+- Datentyp uint16: Der Accumulator nutzt `uint16` statt `uint8`, da an stark
+  frequentierten Stellen der Wert schnell über 255 steigen würde (Overflow). Mehr als
+  65535 Treffer pro Pixel werden gekappt. Erst der Gauß-Filter rechnet in `float32`,
+  ganz am Ende wird auf 0-255 normalisiert.
+- Keine Schleife pro Punkt: SQLite liefert Trefferzahlen je Koordinate, `np.bincount`
+  trägt sie in einem Durchlauf ein und ein einziger Gauß-Filter erzeugt die "Kleckse".
+  Der Aufwand hängt damit von der Bildgröße ab, nicht von der Anzahl der Log-Einträge
+  (ein JIT-Compiler wie Numba bringt hier nichts mehr).
 - Overlay-Technik: Die Heatmap wird mittels `addWeighted` transparent über den 
   Grundriss gelegt, damit räumliche Bezüge (Regale, Wände) erkennbar bleiben.
 """
@@ -29,6 +35,11 @@ import sys
 from database import DatabaseManager
 import config
 
+# Gauß-Kern für die "Kleckse" (Sigma = 12px, ähnliche Ausdehnung wie Kreise mit Radius 25px).
+# Einmalig beim Import berechnet; 97 = Kernelgröße, die GaussianBlur bei Sigma 12 wählt.
+HEATMAP_SIGMA = 12.0
+HEATMAP_KERNEL = cv2.getGaussianKernel(97, HEATMAP_SIGMA, cv2.CV_32F)
+
 def generate_heatmap():
     """
     Hauptfunktion zur Erstellung und Speicherung der Heatmap.
@@ -53,48 +64,49 @@ def generate_heatmap():
 
     height, width = map_img.shape[:2]
 
-    # ---------- 2. Daten-Akquise (Datenbank) ----------
+    # ---------- 2. Initialisierung (Accumulator) ----------
+    # Trefferzahlen als uint16: halb so viel Speicher wie float32, kein Überlauf bis 65535.
+    heatmap_counts = np.zeros((height, width), dtype=np.uint16)
+
+    # ---------- 3. Daten-Akquise & Punkt-Aggregation (Datenbank) ----------
+    # Die Trefferzahlen kommen blockweise aus der DB und werden sofort eingetragen,
+    # der Speicherbedarf bleibt so unabhängig von der Größe der Historie.
+    total_points = 0
+    positions = 0
     try:
         db = DatabaseManager()
-        points = db.get_all_movements()
-        print(f"[DATA] {len(points)} Datenpunkte aus der Historie geladen.")
+        # Boundary-Check in SQL: Es kommen nur Punkte, die im Bild liegen
+        for xs, ys, counts in db.iter_movement_histogram(width, height):
+            total_points += int(counts.sum())
+            positions += len(counts)
+
+            # Jeder Punkt erhöht die "Temperatur" an seiner Koordinate.
+            # Trefferzahlen pro Pixel eintragen (vektorisiert statt Python-Schleife).
+            # Durch GROUP BY ist jede Koordinate eindeutig, eine einfache Zuweisung genügt.
+            heatmap_counts[ys, xs] = np.minimum(counts, np.iinfo(np.uint16).max)
+        print(f"[DATA] {total_points} Datenpunkte ({positions} Positionen) aus der Historie geladen.")
     except Exception as e:
         print(f"❌ Datenbankfehler: {e}")
         return
 
-    if not points:
+    if not positions:
         print("⚠️  Keine Daten vorhanden. Bitte das Tracking erst eine Weile laufen lassen!")
         return
 
-    # ---------- 3. Initialisierung (Accumulator) ----------
-    # Wir erstellen eine leere Matrix mit Float-Präzision, um Überläufe zu vermeiden.
-    heatmap_mask = np.zeros((height, width), dtype=np.float32)
-
     print("[CALC] Berechne Dichte-Verteilung (das kann kurz dauern)...")
 
-    # ---------- 4. Rendering (Punkt-Aggregation) ----------
-    # Jeder Punkt erhöht die "Temperatur" an seiner Koordinate.
-    for row in points:
-        x, y = row['x'], row['y']
-        
-        # Boundary-Check: Liegt der Punkt im Bild?
-        if 0 <= x < width and 0 <= y < height:
-            # Wir erstellen einen temporären Layer mit einem "Klecks" (Kreis)
-            # Radius = 25px, Intensität = 1.0
-            temp_layer = np.zeros((height, width), dtype=np.float32)
-            cv2.circle(temp_layer, (x, y), 25, (1.0), -1) 
-            
-            # Addiere diesen Klecks zum Gesamtbild
-            heatmap_mask += temp_layer
+    # ---------- 4. Rendering (Dichte-Verteilung) ----------
+    # Einmaliges Weichzeichnen der Punktdichte: Jeder Punkt wird zu einem weichen "Klecks".
+    # Separierbarer Gauß-Filter direkt von uint16 nach float32 (ein uint16-Ergebnis würde
+    # einzelne Treffer auf 0 abrunden).
+    # Außerhalb des Bildes wird mit 0 aufgefüllt, Kleckse am Rand werden also beschnitten.
+    heatmap_mask = cv2.sepFilter2D(heatmap_counts, cv2.CV_32F, HEATMAP_KERNEL, HEATMAP_KERNEL,
+                                   borderType=cv2.BORDER_CONSTANT)
 
     # ---------- 5. Normalisierung & Post-Processing ----------
-    # Skaliere die Werte auf den Bereich 0-255 für die Bilddarstellung
-    max_val = np.max(heatmap_mask)
-    if max_val > 0:
-        heatmap_mask = heatmap_mask / max_val * 255
-    
-    # Konvertierung zurück in 8-Bit Integer (für OpenCV Bilder)
-    heatmap_mask_8bit = np.uint8(heatmap_mask)
+    # Skaliere die Werte auf den Bereich 0-255 für die Bilddarstellung.
+    # NORM_INF: Maximum -> 255 (0 bleibt 0), inkl. Konvertierung in 8-Bit Integer in einem Aufruf.
+    heatmap_mask_8bit = cv2.normalize(heatmap_mask, None, 255, 0, cv2.NORM_INF, dtype=cv2.CV_8U)
 
     # ---------- 6. Einfärben (False Color Mapping) ----------
     # COLORMAP_JET Verlauf: Blau (kalt) -> Grün -> Gelb -> Rot (heiß)
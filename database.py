@@ -7,55 +7,295 @@ Zweck
 Diese Datei verwaltet die dauerhafte Speicherung aller Daten (SQLite):
 1. Inventar-Verwaltung: Speichert Schränke/Objekte mit Status (Ware) und Zeitstempeln (Erscheinung/Abgang).
 2. Bewegungs-Tracking: Loggt X/Y-Koordinaten für spätere Analysen (z.B. Heatmap).
-3. Ressourcen-Management: Sicheres Öffnen/Schließen der Verbindung via Context Manager.
+3. Live-Status: Spiegelt die aktuell getrackten QR-Codes in die Tabelle 'qr_state' (für GUIs).
+4. Ressourcen-Management: Sicheres Öffnen/Schließen der Verbindungen via Context Manager.
 
 Design-Notizen
 --------------
 - Context Manager: Implementiert `__enter__` und `__exit__`, um Verbindungen automatisch zu schließen.
 - Row Factory: Nutzt `sqlite3.Row`, damit Datenbank-Ergebnisse wie Dictionaries (Zugriff per Spaltenname) behandelt werden können.
 - Fehlerbehandlung: Kritische Operationen sind in Try-Except-Blöcken gekapselt.
+- WAL-Modus: Jede Verbindung wird direkt nach dem Öffnen per PRAGMA konfiguriert
+  (Write-Ahead-Log, synchronous=NORMAL, busy_timeout). Dadurch blockieren Leser
+  (Web-Server, CLI) den Tracker beim Schreiben nicht mehr und umgekehrt.
+- Connection-Pool (1 Schreiber + N Leser): Alle Schreibzugriffe laufen seriell über
+  eine einzige, per Lock geschützte Verbindung. Lesezugriffe holen sich eine
+  Read-Only-Verbindung aus einem begrenzten Pool. Die Verbindungen werden erst bei
+  Bedarf geöffnet und danach wiederverwendet.
+- Schreib-Transaktionen: `write_tx()` startet jede Transaktion mit 'BEGIN IMMEDIATE',
+  damit die Schreibsperre sofort gehalten wird (kein SQLITE_BUSY beim Hochstufen).
+- WAL-Checkpoints: Langlaufende Prozesse (Tracker) starten mit `start_checkpointer()`
+  einen Hintergrund-Thread, der das WAL regelmäßig per TRUNCATE zurücksetzt, und zwar
+  nur, wenn gerade kein Schreibzugriff läuft. Der Auto-Checkpoint greift seltener.
+- Gemeinsame Instanz: `get_default_db()` liefert pro Prozess einen einzigen Manager für
+  die Standard-Datei. Menü, Web-Server und CLI-Dialoge teilen sich so Verbindungen
+  und Page-Cache, statt bei jedem Aufruf neu zu verbinden.
 """
 
+import os
 import sqlite3
-from datetime import datetime
+import threading
+import time
+import numpy as np
+from contextlib import contextmanager
+from pathlib import Path
+from queue import Queue, Empty
 
 # Name der Datenbank-Datei als Konstante
 DB_FILE = 'Schrank_Bestand.db'
 
+# Maximale Anzahl paralleler Lese-Verbindungen pro DatabaseManager
+READ_POOL_SIZE = os.cpu_count() or 4
+
+# Größe des Prepared-Statement-Caches pro Verbindung (sqlite3-Default: 128)
+STATEMENT_CACHE_SIZE = 256
+
+# PRAGMAs, die direkt nach jedem Verbindungsaufbau gesetzt werden.
+# Kein 'cache=shared': jede Verbindung behält ihren eigenen Page-Cache.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",     # Leser und Schreiber blockieren sich nicht gegenseitig
+    "PRAGMA synchronous=NORMAL;",   # Kein fsync pro Commit (im WAL-Modus sicher)
+    "PRAGMA busy_timeout=5000;",    # [ms] Warten statt sofortigem SQLITE_BUSY
+    "PRAGMA cache_size=-65536;",    # bis 64 MB Page-Cache (negativ = KiB), wird erst bei Bedarf belegt
+    "PRAGMA temp_store=MEMORY;",    # Temporäre Tabellen/Indizes im RAM
+    "PRAGMA foreign_keys=ON;",
+)
+
+# Auto-Checkpoint der Schreib-Verbindung erst ab 2000 WAL-Seiten (SQLite-Default: 1000)
+WAL_AUTOCHECKPOINT_PAGES = 2000
+
+# [s] Abstand der TRUNCATE-Checkpoints im Hintergrund-Thread
+CHECKPOINT_INTERVAL = 60
+
+# Zeilen pro Block beim blockweisen Lesen großer Abfragen (fetchmany)
+FETCH_CHUNK_SIZE = 100_000
+
+# SQL-Statements als Modul-Konstanten: Identische Strings treffen den Statement-Cache
+# von sqlite3, d.h. SQLite parst/plant jedes Statement nur einmal pro Verbindung.
+_SQL_BEGIN_IMMEDIATE = "BEGIN IMMEDIATE;"
+_SQL_WAL_CHECKPOINT = "PRAGMA wal_checkpoint(TRUNCATE);"
+_SQL_INSERT_SCHRANK = "INSERT INTO schraenke (ware, erscheinungspunkt, abgangspunkt) VALUES (?, ?, ?);"
+_SQL_SELECT_SCHRANK = "SELECT * FROM schraenke WHERE id = ?;"
+_SQL_DELETE_SCHRANK = "DELETE FROM schraenke WHERE id = ?;"
+_SQL_UPDATE_ERSCHEINUNG = "UPDATE schraenke SET erscheinungspunkt = ? WHERE id = ?;"
+_SQL_UPDATE_ABGANG = "UPDATE schraenke SET abgangspunkt = ? WHERE id = ?;"
+_SQL_STATUS_INACTIVE = "UPDATE schraenke SET abgangspunkt = ?, erscheinungspunkt = NULL WHERE id = ?;"
+# Eingang in EINEM Statement: Abgang löschen, Startzeit nur setzen, falls das Feld leer ist
+_SQL_STATUS_ACTIVE = """
+    UPDATE schraenke
+    SET abgangspunkt = NULL,
+        erscheinungspunkt = CASE WHEN erscheinungspunkt IS NULL THEN ? ELSE erscheinungspunkt END
+    WHERE id = ?;
+"""
+# Tracking-Ereignisse (touch_schranks): Zeitstempel nur setzen, wenn das Feld leer ist,
+# dadurch braucht das UPDATE keine vorherige Prüfung (kein SELECT) in Python
+_SQL_TOUCH_SEEN = """
+    UPDATE schraenke
+    SET erscheinungspunkt = COALESCE(erscheinungspunkt, ?),
+        abgangspunkt = NULL
+    WHERE id = ?;
+"""
+_SQL_TOUCH_LOST = "UPDATE schraenke SET abgangspunkt = COALESCE(abgangspunkt, ?) WHERE id = ?;"
+_SQL_INSERT_MOVEMENT = "INSERT INTO movement_log (schrank_id, x, y, timestamp) VALUES (?, ?, ?, ?);"
+_SQL_SELECT_MOVEMENTS = "SELECT x, y FROM movement_log;"
+_SQL_SELECT_MOVEMENTS_BOUNDED = """
+    SELECT x, y FROM movement_log
+    WHERE x BETWEEN 0 AND ? AND y BETWEEN 0 AND ?;
+"""
+_SQL_MOVEMENT_HISTOGRAM = "SELECT x, y, COUNT(*) FROM movement_log GROUP BY x, y;"
+_SQL_MOVEMENT_HISTOGRAM_BOUNDED = """
+    SELECT x, y, COUNT(*) FROM movement_log
+    WHERE x BETWEEN 0 AND ? AND y BETWEEN 0 AND ?
+    GROUP BY x, y;
+"""
+# Kein "ON CONFLICT ... DO UPDATE": erst ab SQLite 3.24 verfügbar (Jetson/Ubuntu 18.04: 3.22).
+# Da immer alle Spalten geschrieben werden, ist INSERT OR REPLACE gleichwertig.
+_SQL_UPSERT_QR_STATE = """
+    INSERT OR REPLACE INTO qr_state (uid, content, first_seen, last_seen, status, x, y, w, h)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+"""
+_SQL_DELETE_QR_STATE = "DELETE FROM qr_state WHERE uid = ?;"
+
 class DatabaseManager:
-    def __init__(self, db_file=DB_FILE):
+    def __init__(self, db_file=DB_FILE, read_pool_size=READ_POOL_SIZE):
         """Konstruktor: Setzt den Dateipfad, öffnet aber noch keine Verbindung."""
         self.db_file = db_file
-        self.conn = None
+
+        # Schreiber: genau eine Verbindung, serialisiert über ein Lock
+        self._write_conn = None
+        self._write_cursor = None
+        self._write_lock = threading.Lock()
+
+        # Leser: begrenzter Pool, wird bei Bedarf bis read_pool_size aufgefüllt
+        self._read_pool = Queue(maxsize=read_pool_size)
+        self._read_pool_size = read_pool_size
+        self._read_conns = []
+        self._pool_lock = threading.Lock()
+
+        # Zuletzt formatierter Zeitstempel als (Sekunde, Text), siehe _timestamp()
+        self._ts_cache = (None, None)
+
+        # Checkpoint-Thread (optional, siehe start_checkpointer)
+        self._checkpoint_thread = None
+        self._checkpoint_stop = threading.Event()
+
+    # ---------- Verbindungs-Setup ----------
+
+    def _configure_connection(self, conn):
+        """Setzt die PRAGMAs aus CONNECTION_PRAGMAS auf einer frisch geöffneten Verbindung."""
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+
+        # Validierung: WAL kann z.B. auf Netzlaufwerken nicht aktiviert werden
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode.lower() != "wal":
+            print(f"[DB] Warnung: WAL-Modus nicht aktiv (journal_mode={mode}).")
+
+    def _get_write_conn(self):
+        """Öffnet die Schreib-Verbindung beim ersten Zugriff (Aufrufer hält _write_lock)."""
+        if self._write_conn is None:
+            # isolation_level=None: Transaktionen werden explizit in write_tx() gesteuert
+            conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+            self._configure_connection(conn)
+            conn.execute(f"PRAGMA wal_autocheckpoint={WAL_AUTOCHECKPOINT_PAGES};")
+            conn.row_factory = sqlite3.Row
+            self._write_conn = conn
+            # Ein Cursor für alle Schreib-Transaktionen (Zugriff ist über _write_lock serialisiert)
+            self._write_cursor = conn.cursor()
+        return self._write_conn
+
+    def _open_read_conn(self):
+        """Öffnet eine neue Read-Only-Verbindung (mode=ro) für den Lese-Pool."""
+        # Der Schreiber legt die Datei an und aktiviert WAL, bevor gelesen wird
+        with self._write_lock:
+            self._get_write_conn()
+
+        uri = Path(os.path.abspath(self.db_file)).as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        self._configure_connection(conn)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def write_tx(self):
+        """
+        Schreib-Transaktion mit exklusivem Zugriff auf die Schreib-Verbindung.
+
+        'BEGIN IMMEDIATE' holt die Schreibsperre sofort, statt eine Lese-Transaktion
+        später hochzustufen (vermeidet SQLITE_BUSY bei konkurrierenden Schreibern).
+        Commit bei Erfolg, Rollback bei Exceptions.
+        """
+        with self._write_lock:
+            conn = self._get_write_conn()
+            cursor = self._write_cursor
+            cursor.execute(_SQL_BEGIN_IMMEDIATE)
+            try:
+                yield cursor
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+
+    @contextmanager
+    def read_conn(self):
+        """Leiht eine Lese-Verbindung aus dem Pool und gibt sie danach zurück."""
+        try:
+            conn = self._read_pool.get_nowait()
+        except Empty:
+            conn = None
+            with self._pool_lock:
+                if len(self._read_conns) < self._read_pool_size:
+                    conn = self._open_read_conn()
+                    self._read_conns.append(conn)
+            if conn is None:
+                # Pool ausgeschöpft: warten, bis ein anderer Thread eine Verbindung zurückgibt
+                conn = self._read_pool.get()
+        try:
+            yield conn
+        finally:
+            self._read_pool.put(conn)
+
+    # ---------- WAL-Checkpoints ----------
+
+    def start_checkpointer(self, interval=CHECKPOINT_INTERVAL):
+        """Startet den Hintergrund-Thread, der das WAL alle `interval` Sekunden leert."""
+        if self._checkpoint_thread is not None:
+            return
+        self._checkpoint_stop.clear()
+        self._checkpoint_thread = threading.Thread(
+            target=self._checkpoint_loop, args=(interval,), name="WALCheckpoint", daemon=True)
+        self._checkpoint_thread.start()
+
+    def _checkpoint_loop(self, interval):
+        while not self._checkpoint_stop.wait(interval):
+            # Nur im Leerlauf: Läuft gerade ein Schreibzugriff, wird diese Runde übersprungen
+            if not self._write_lock.acquire(blocking=False):
+                continue
+            try:
+                if self._write_conn is not None:
+                    self._write_conn.execute(_SQL_WAL_CHECKPOINT)
+            except sqlite3.Error as e:
+                print(f"[DB] WAL-Checkpoint fehlgeschlagen: {e}")
+            finally:
+                self._write_lock.release()
+
+    def stop_checkpointer(self):
+        """Beendet den Checkpoint-Thread (falls gestartet)."""
+        if self._checkpoint_thread is None:
+            return
+        self._checkpoint_stop.set()
+        self._checkpoint_thread.join()
+        self._checkpoint_thread = None
+
+    def close(self):
+        """Schließt alle offenen Verbindungen (Schreiber und Lese-Pool)."""
+        self.stop_checkpointer()
+        with self._write_lock:
+            if self._write_conn is not None:
+                self._write_conn.close()
+                self._write_conn = None
+                self._write_cursor = None
+        with self._pool_lock:
+            for conn in self._read_conns:
+                conn.close()
+            self._read_conns = []
+            self._read_pool = Queue(maxsize=self._read_pool_size)
 
     def __enter__(self):
         """
         Ermöglicht die Nutzung des 'with'-Statements.
-        Öffnet die Verbindung und setzt die Row-Factory.
+        Die Verbindungen werden erst beim ersten Zugriff geöffnet.
         """
-        try:
-            self.conn = sqlite3.connect(self.db_file)
-            self.conn.row_factory = sqlite3.Row 
-            return self
-        except sqlite3.Error as e:
-            print(f"Fehler beim Verbinden mit der Datenbank: {e}")
-            raise
+        return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """
         Wird am Ende des 'with'-Blocks aufgerufen.
-        Schließt die Verbindung sauber.
+        Schließt alle Verbindungen sauber.
+        """
+        self.close()
+
+    def _timestamp(self):
+        """
+        Aktueller Zeitstempel als 'YYYY-MM-DD HH:MM:SS'.
+        strftime() läuft nur einmal pro Sekunde, danach wird der Text wiederverwendet.
         """
-        if self.conn:
-            self.conn.close()
+        sec = int(time.time())
+        cached_sec, text = self._ts_cache
+        if sec != cached_sec:
+            text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sec))
+            self._ts_cache = (sec, text) # Tupel: Threads sehen nie Sekunde und Text gemischt
+        return text
 
     # ---------- Tabellen-Initialisierung ----------
 
     def create_schrank_table(self):
         """Erstellt die Haupttabelle 'schraenke', falls sie nicht existiert."""
-        with self:
-            try:
-                cursor = self.conn.cursor()
+        try:
+            with self.write_tx() as cursor:
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS schraenke (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -64,46 +304,35 @@ class DatabaseManager:
                         abgangspunkt TEXT
                     );
                 """)
-                self.conn.commit()
-                print("Tabelle 'schraenke' erfolgreich sichergestellt.")
-            except sqlite3.Error as e:
-                print(f"Fehler beim Erstellen der Tabelle: {e}")
+            print("Tabelle 'schraenke' erfolgreich sichergestellt.")
+        except sqlite3.Error as e:
+            print(f"Fehler beim Erstellen der Tabelle: {e}")
 
     # ---------- CRUD Operationen (Inventar) ----------
 
     def insert_schrank(self, schrank_instance):
         """Fügt einen neuen Schrank-Eintrag hinzu und gibt die neue ID zurück."""
-        sql = """
-            INSERT INTO schraenke (ware, erscheinungspunkt, abgangspunkt) 
-            VALUES (?, ?, ?);
-        """
         try:
-            with self:
-                cursor = self.conn.cursor()
+            with self.write_tx() as cursor:
                 data_tuple = (
-                    schrank_instance.ware, 
-                    schrank_instance.erscheinungspunkt, 
+                    schrank_instance.ware,
+                    schrank_instance.erscheinungspunkt,
                     schrank_instance.abgangspunkt
                 )
-                cursor.execute(sql, data_tuple)
-                self.conn.commit()
+                cursor.execute(_SQL_INSERT_SCHRANK, data_tuple)
                 new_id = cursor.lastrowid
-                return new_id
+            return new_id
         except sqlite3.Error as e:
             print(f"Fehler beim Einfügen des Schrankes: {e}")
-            self.conn.rollback()
             return None
 
     def get_schrank_by_id(self, schrank_id):
         """Liest einen Schrank anhand der ID aus und gibt ihn als Dictionary zurück."""
-        sql = "SELECT * FROM schraenke WHERE id = ?;"
         try:
-            with self:
-                cursor = self.conn.cursor()
-                cursor.execute(sql, (schrank_id,))
-                result = cursor.fetchone() 
+            with self.read_conn() as conn:
+                result = conn.execute(_SQL_SELECT_SCHRANK, (schrank_id,)).fetchone()
                 if result:
-                    return dict(result) 
+                    return dict(result)
                 else:
                     return None
         except sqlite3.Error as e:
@@ -115,100 +344,134 @@ class DatabaseManager:
         Löscht einen einzelnen Schrank anhand seiner ID aus der Datenbank.
         Rückgabe: True bei Erfolg, False wenn ID nicht gefunden oder Fehler.
         """
-        sql = "DELETE FROM schraenke WHERE id = ?;"
         try:
-            with self:
-                cursor = self.conn.cursor()
-                cursor.execute(sql, (schrank_id,))
-                self.conn.commit()
-                
-                # Prüfen, ob eine Zeile betroffen war
-                if cursor.rowcount > 0:
-                    return True
-                else:
-                    return False
+            with self.write_tx() as cursor:
+                cursor.execute(_SQL_DELETE_SCHRANK, (schrank_id,))
+                # Innerhalb der Transaktion lesen: Der Cursor wird danach wiederverwendet
+                deleted = cursor.rowcount
+
+            # Prüfen, ob eine Zeile betroffen war
+            if deleted > 0:
+                return True
+            else:
+                return False
         except sqlite3.Error as e:
             print(f"Fehler beim Löschen von ID {schrank_id}: {e}")
             return False
-    
+
+    def pop_schranks_by_ids(self, schrank_ids):
+        """
+        Liest und löscht mehrere Schränke atomar in EINER Transaktion.
+        Rückgabe: Liste der tatsächlich gelöschten Schränke als Dictionaries
+        (IDs, die inzwischen nicht mehr existieren, fehlen), bei Fehlern leer.
+
+        Kein "DELETE ... RETURNING": erst ab SQLite 3.35 verfügbar (Jetson/Ubuntu 18.04: 3.22).
+        SELECT und DELETE laufen deshalb in derselben Schreib-Transaktion, dazwischen
+        kann kein anderer Prozess die Zeilen ändern.
+        """
+        if not schrank_ids:
+            return []
+        try:
+            with self.write_tx() as cursor:
+                popped = []
+                for schrank_id in schrank_ids:
+                    row = cursor.execute(_SQL_SELECT_SCHRANK, (schrank_id,)).fetchone()
+                    if row:
+                        popped.append(dict(row))
+                cursor.executemany(_SQL_DELETE_SCHRANK, [(data['id'],) for data in popped])
+            return popped
+        except sqlite3.Error as e:
+            print(f"Fehler beim Löschen der IDs {list(schrank_ids)}: {e}")
+            return []
+
     # ---------- Zeit-Management & Status-Logik ----------
 
     def update_erscheinungszeit(self, schrank_id, timestamp):
         """Setzt explizit den 'erscheinungspunkt' (Zeit) für eine ID."""
-        sql = "UPDATE schraenke SET erscheinungspunkt = ? WHERE id = ?;"
         try:
-            with self:
-                cursor = self.conn.cursor()
-                cursor.execute(sql, (timestamp, schrank_id))
-                self.conn.commit()
-                return True
+            with self.write_tx() as cursor:
+                cursor.execute(_SQL_UPDATE_ERSCHEINUNG, (timestamp, schrank_id))
+            return True
         except sqlite3.Error as e:
             print(f"Fehler beim Update der Erscheinungszeit für ID {schrank_id}: {e}")
             return False
 
     def update_abgangszeit(self, schrank_id, timestamp):
         """Setzt explizit den 'abgangspunkt'. Timestamp=None leert das Feld."""
-        sql = "UPDATE schraenke SET abgangspunkt = ? WHERE id = ?;"
         try:
-            with self:
-                cursor = self.conn.cursor()
-                cursor.execute(sql, (timestamp, schrank_id))
-                self.conn.commit()
-                return True
+            with self.write_tx() as cursor:
+                cursor.execute(_SQL_UPDATE_ABGANG, (timestamp, schrank_id))
+            return True
         except sqlite3.Error as e:
             print(f"Fehler beim Update der Abgangszeit für ID {schrank_id}: {e}")
             return False
-            
+
+    def touch_schranks(self, seen_ids=(), lost_ids=(), timestamp=None, with_previous=False):
+        """
+        Meldet gesehene und verlorene Schränke in EINER Schreib-Transaktion,
+        mit einem UPDATE pro Ereignis (ohne vorheriges SELECT).
+        - Gesehen: 'erscheinungspunkt' setzen (falls leer), 'abgangspunkt' leeren.
+        - Verloren: 'abgangspunkt' setzen (falls leer).
+        - timestamp: None = aktuelle Zeit.
+
+        Rückgabe: bei Fehlern None, sonst ein Dictionary. Nur mit with_previous=True
+        (z.B. für Log-Ausgaben) enthält es {id -> sqlite3.Row} mit dem Stand VOR der
+        Änderung (nicht gefundene IDs fehlen). Diese Zeilen werden in derselben
+        Transaktion gelesen, kein anderer Prozess kann den Stand dazwischen ändern.
+        """
+        if not seen_ids and not lost_ids:
+            return {}
+        if timestamp is None:
+            timestamp = self._timestamp()
+        try:
+            with self.write_tx() as cursor:
+                previous = {}
+                if with_previous:
+                    for schrank_id in (*seen_ids, *lost_ids):
+                        row = cursor.execute(_SQL_SELECT_SCHRANK, (schrank_id,)).fetchone()
+                        if row:
+                            previous[schrank_id] = row
+                if seen_ids:
+                    cursor.executemany(_SQL_TOUCH_SEEN, [(timestamp, schrank_id) for schrank_id in seen_ids])
+                if lost_ids:
+                    cursor.executemany(_SQL_TOUCH_LOST, [(timestamp, schrank_id) for schrank_id in lost_ids])
+            return previous
+        except sqlite3.Error as e:
+            print(f"Fehler beim Melden der Tracking-Ereignisse: {e}")
+            return None
+
     def update_schrank_status(self, uid, status, timestamp):
         """
         Komplexe Status-Logik für Anwesenheit (Active/Inactive).
-        
+
         Logik:
         - Inactive (Abgang): Setzt Abgangszeit, löscht Erscheinungszeit.
         - Active (Eingang/Rückkehr): Löscht Abgangszeit, setzt neue Erscheinungszeit (falls leer).
         """
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                
+            with self.write_tx() as cursor:
                 if status == "inactive":
                     # --- ABGANG ---
                     # Setzt Abgangszeit und entfernt den alten Startpunkt
-                    cursor.execute("""
-                        UPDATE schraenke 
-                        SET abgangspunkt = ?, erscheinungspunkt = NULL 
-                        WHERE id = ?
-                    """, (timestamp, uid))
-                    
+                    cursor.execute(_SQL_STATUS_INACTIVE, (timestamp, uid))
+
                 elif status == "active":
                     # --- EINGANG ---
-                    # Schritt A: Abgang entfernen (da Objekt wieder da ist)
-                    cursor.execute("""
-                        UPDATE schraenke 
-                        SET abgangspunkt = NULL 
-                        WHERE id = ?
-                    """, (uid,))
-                    
-                    # Schritt B: Neue Startzeit setzen, falls Feld leer ist
-                    cursor.execute("""
-                        UPDATE schraenke 
-                        SET erscheinungspunkt = ? 
-                        WHERE id = ? AND erscheinungspunkt IS NULL
-                    """, (timestamp, uid))
-                    
-                conn.commit()
-                print(f"[DB] ID {uid} Status '{status}' -> Zeiten aktualisiert.")
-                
+                    # Abgang entfernen (da Objekt wieder da ist) und neue Startzeit
+                    # setzen, falls das Feld leer ist
+                    cursor.execute(_SQL_STATUS_ACTIVE, (timestamp, uid))
+
+            print(f"[DB] ID {uid} Status '{status}' -> Zeiten aktualisiert.")
+
         except Exception as e:
             print(f"DB Fehler bei Update ID {uid}: {e}")
-            
+
     # ---------- Bewegungs-Log (Analytics) ----------
 
     def create_movement_table(self):
         """Erstellt die Tabelle 'movement_log' für die Historie der Positionen."""
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
+            with self.write_tx() as cursor:
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS movement_log (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -218,36 +481,153 @@ class DatabaseManager:
                         timestamp TEXT
                     )
                 """)
-                conn.commit()
+                # Kein Index pro ID/Zeit: Keine Abfrage liest Positionen einzelner IDs,
+                # jeder Eintrag würde nur die Inserts verlangsamen. Ein in älteren
+                # Datenbanken bereits angelegter Index wird entfernt.
+                cursor.execute("DROP INDEX IF EXISTS idx_movement_log_schrank_ts")
+                # Covering-Index für die Heatmap (GROUP BY x, y): Die Abfrage liest nur
+                # den sortierten Index statt die ganze Tabelle (kein temporärer B-Baum).
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_movement_log_xy
+                    ON movement_log (x, y)
+                """)
         except Exception as e:
             print(f"Fehler beim Erstellen der Log-Tabelle: {e}")
 
-    def log_movement(self, schrank_id, x, y):
+    def log_movement_bulk(self, entries):
         """
-        Speichert einen Positions-Schnappschuss mit aktuellem Zeitstempel.
+        Speichert mehrere Positions-Schnappschüsse in EINER Transaktion.
         Dient zur Erstellung von Bewegungspfaden oder Heatmaps.
+
+        Argumente:
+        - entries: Liste von (schrank_id, x, y)-Tupeln. Alle erhalten denselben Zeitstempel.
         """
+        if not entries:
+            return
         try:
-            # Timestamp hier generieren, da 'datetime' importiert ist
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO movement_log (schrank_id, x, y, timestamp)
-                    VALUES (?, ?, ?, ?)
-                """, (schrank_id, int(x), int(y), now))
-                conn.commit()
+            now = self._timestamp()
+            rows = [(schrank_id, int(x), int(y), now) for schrank_id, x, y in entries]
+            with self.write_tx() as cursor:
+                cursor.executemany(_SQL_INSERT_MOVEMENT, rows)
         except Exception as e:
             print(f"Log Error: {e}")
-            
-    def get_all_movements(self):
-        """Holt alle rohen X/Y-Koordinaten für die Visualisierung."""
+
+    def _iter_arrays(self, sql, params, columns, dtype, chunk_size=FETCH_CHUNK_SIZE):
+        """
+        Liest ein rein numerisches Abfrage-Ergebnis blockweise als NumPy-Arrays
+        (höchstens chunk_size x columns). Ohne Row Factory: Die Zeilen kommen als Tupel
+        und gehen direkt an NumPy. Die Lese-Verbindung bleibt bis zum Ende geliehen.
+        """
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.read_conn() as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT x, y FROM movement_log")
-                return cursor.fetchall()
-        except Exception as e:
+                cursor.row_factory = None
+                cursor.execute(sql, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield np.array(rows, dtype=dtype).reshape(-1, columns)
+        except sqlite3.Error as e:
             print(f"Fetch Error: {e}")
-            return []
+
+    def _fetch_array(self, sql, params, columns, dtype):
+        """Liest ein rein numerisches Abfrage-Ergebnis komplett als NumPy-Array (N, columns)."""
+        chunks = list(self._iter_arrays(sql, params, columns, dtype))
+        if not chunks:
+            return np.empty((0, columns), dtype=dtype)
+        return np.concatenate(chunks)
+
+    def _movement_query(self, sql, sql_bounded, width, height):
+        """Wählt die Abfrage mit oder ohne Bildgrenzen (0 <= x < width, 0 <= y < height)."""
+        if width is None or height is None:
+            return sql, ()
+        return sql_bounded, (width - 1, height - 1)
+
+    def get_all_movements(self, width=None, height=None):
+        """
+        Holt alle rohen X/Y-Koordinaten für die Visualisierung als int32-Array (N, 2).
+        Mit width/height filtert SQLite bereits alle Punkte außerhalb des Bildes heraus.
+        """
+        sql, params = self._movement_query(_SQL_SELECT_MOVEMENTS, _SQL_SELECT_MOVEMENTS_BOUNDED, width, height)
+        return self._fetch_array(sql, params, 2, np.int32)
+
+    def get_movement_histogram(self, width=None, height=None):
+        """
+        Zählt die Einträge pro Koordinate direkt in SQLite (GROUP BY x, y).
+        Mit width/height werden nur Punkte innerhalb des Bildes gezählt.
+        Rückgabe: (xs, ys, counts) als NumPy-Arrays, bei Fehlern leer.
+        """
+        sql, params = self._movement_query(_SQL_MOVEMENT_HISTOGRAM, _SQL_MOVEMENT_HISTOGRAM_BOUNDED, width, height)
+        hist = self._fetch_array(sql, params, 3, np.int64)
+        return hist[:, 0], hist[:, 1], hist[:, 2]
+
+    def iter_movement_histogram(self, width=None, height=None, chunk_size=FETCH_CHUNK_SIZE):
+        """Wie get_movement_histogram(), liefert (xs, ys, counts) aber blockweise (Generator)."""
+        sql, params = self._movement_query(_SQL_MOVEMENT_HISTOGRAM, _SQL_MOVEMENT_HISTOGRAM_BOUNDED, width, height)
+        for hist in self._iter_arrays(sql, params, 3, np.int64, chunk_size):
+            yield hist[:, 0], hist[:, 1], hist[:, 2]
+
+    # ---------- Live-Status der QR-Codes (Ersatz für die JSON-Datei) ----------
+
+    def create_qr_state_table(self):
+        """Erstellt die Tabelle 'qr_state' mit dem aktuellen Tracking-Zustand je ID."""
+        try:
+            with self.write_tx() as cursor:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS qr_state (
+                        uid INTEGER PRIMARY KEY,
+                        content TEXT,
+                        first_seen TEXT,
+                        last_seen REAL,
+                        status TEXT,
+                        x INTEGER,
+                        y INTEGER,
+                        w INTEGER,
+                        h INTEGER
+                    )
+                """)
+        except Exception as e:
+            print(f"Fehler beim Erstellen der Status-Tabelle: {e}")
+
+    def clear_qr_state(self):
+        """Leert 'qr_state' (z.B. beim Start, damit kein Zustand vom letzten Lauf übrig bleibt)."""
+        try:
+            with self.write_tx() as cursor:
+                cursor.execute("DELETE FROM qr_state;")
+        except Exception as e:
+            print(f"Fehler beim Leeren der Status-Tabelle: {e}")
+
+    def update_qr_state(self, rows, removed_uids=()):
+        """
+        Aktualisiert den Live-Status inkrementell in EINER Transaktion.
+
+        Argumente:
+        - rows: Liste von (uid, content, first_seen, last_seen, status, x, y, w, h).
+        - removed_uids: IDs, die nicht mehr getrackt werden (werden gelöscht).
+        """
+        try:
+            with self.write_tx() as cursor:
+                if removed_uids:
+                    cursor.executemany(_SQL_DELETE_QR_STATE, [(uid,) for uid in removed_uids])
+                if rows:
+                    cursor.executemany(_SQL_UPSERT_QR_STATE, rows)
+        except Exception as e:
+            print(f"Status Error: {e}")
+
+# ---------- Gemeinsame Instanz ----------
+
+_default_db = None
+_default_db_lock = threading.Lock()
+
+def get_default_db():
+    """
+    Liefert den prozessweiten DatabaseManager für DB_FILE (wird beim ersten Aufruf erzeugt).
+    Thread-sicher, da z.B. Web-Server und CLI-Menü im selben Prozess laufen.
+    """
+    global _default_db
+    if _default_db is None:
+        with _default_db_lock:
+            if _default_db is None:
+                _default_db = DatabaseManager()
+    return _default_db
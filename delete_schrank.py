@@ -2,72 +2,99 @@
 """
 Interaktives Skript zum Löschen von Schränken.
 
-Fragt den Nutzer nach einer Schrank-ID, zeigt die gefundenen Daten zur 
-Kontrolle an und löscht (nach einer Sicherheitsabfrage) sowohl den Eintrag 
-aus der SQLite-Datenbank als auch das dazugehörige QR-Code-Bild vom PC.
+Fragt den Nutzer nach einer oder mehreren Schrank-IDs (kommagetrennt), zeigt die
+gefundenen Daten zur Kontrolle an und löscht (nach einer Sicherheitsabfrage) sowohl
+die Einträge aus der SQLite-Datenbank als auch die dazugehörigen QR-Code-Bilder vom PC.
+Alle Datenbank-Einträge werden dabei in einer einzigen Transaktion gelöscht.
 """
 
-from database import DatabaseManager
+import sys
+
+from database import get_default_db
 from qr_generator import QRCodeGenerator
 
 def delete_existing_schrank():
     """
     Führt den kompletten Lösch-Dialog durch.
     
-    Holt zuerst den Datensatz zur Vorschau aus der DB, um versehentliche 
+    Holt zuerst die Datensätze zur Vorschau aus der DB, um versehentliche 
     Löschungen zu vermeiden. Erst nach expliziter Bestätigung mit 'ja' 
-    werden der DB-Eintrag und die physische QR-Code-Datei entfernt.
+    werden die DB-Einträge und die physischen QR-Code-Dateien entfernt.
     """
     print("--- Schrank löschen ---")
     
     # ---------- 1. Benutzereingabe ----------
-    id_input = input("Welche Schrank-ID soll gelöscht werden? ")
+    id_input = input("Welche Schrank-ID(s) sollen gelöscht werden? (z.B. 3 oder 3,7,12) ")
     
     try:
-        schrank_id = int(id_input)
+        # Doppelte IDs entfernen, Reihenfolge der Eingabe beibehalten
+        schrank_ids = list(dict.fromkeys(int(part) for part in id_input.split(",") if part.strip()))
     except ValueError:
         print("Fehler: Das ist keine gültige Zahl. Abbruch.")
         return
 
+    if not schrank_ids:
+        print("Fehler: Keine ID angegeben. Abbruch.")
+        return
+
     # ---------- 2. Ressourcen-Initialisierung ----------
-    db_manager = DatabaseManager()
+    # Gemeinsamer Manager: Wiederholte Aufrufe (z.B. aus dem Menü) verbinden nicht jedes Mal neu.
+    db_manager = get_default_db()
     qr_gen = QRCodeGenerator()
     
     try:
         # ---------- 3. Verifikation (Lookup) ----------
-        schrank_data = db_manager.get_schrank_by_id(schrank_id)
-        
-        if not schrank_data:
-            print(f"Fehler: Ein Schrank mit der ID {schrank_id} wurde nicht gefunden.")
+        found = []
+        for schrank_id in schrank_ids:
+            schrank_data = db_manager.get_schrank_by_id(schrank_id)
+            if schrank_data:
+                found.append(schrank_data)
+            else:
+                print(f"Fehler: Ein Schrank mit der ID {schrank_id} wurde nicht gefunden.")
+
+        if not found:
             return
             
-        print("\n--- Folgender Schrank wird gelöscht ---")
-        print(f" ID: {schrank_data['id']}")
-        print(f" Ware: {schrank_data['ware']}")
-        print(f" Erschien: {schrank_data['erscheinungspunkt']}")
-        print(f" Abgang: {schrank_data['abgangspunkt']}")
-        print("---------------------------------------")
+        # Vorschau als ein einziger Block ausgeben (ein write statt fünf prints pro Schrank)
+        preview = ["\n--- Folgende Schränke werden gelöscht ---\n"]
+        for schrank_data in found:
+            preview.append(
+                f" ID: {schrank_data['id']}\n"
+                f" Ware: {schrank_data['ware']}\n"
+                f" Erschien: {schrank_data['erscheinungspunkt']}\n"
+                f" Abgang: {schrank_data['abgangspunkt']}\n"
+                "---------------------------------------\n"
+            )
+        sys.stdout.write("".join(preview))
+        sys.stdout.flush()
 
         # ---------- 4. Sicherheitsabfrage ----------
-        confirm = input("Diesen Eintrag wirklich löschen? (ja/nein): ").lower()
+        confirm = input("Diese Einträge wirklich löschen? (ja/nein): ").lower()
         
         if confirm == 'ja':
             # ---------- 5. Datenbank-Bereinigung ----------
-            if db_manager.delete_schrank_by_id(schrank_id):
-                print(f"Schrank {schrank_id} erfolgreich aus der Datenbank gelöscht.")
+            # Alle Löschungen in einer Transaktion. Zurück kommen nur die Schränke, die
+            # beim Löschen noch existierten (die Vorschau oben kann inzwischen veraltet sein).
+            found_ids = [schrank_data['id'] for schrank_data in found]
+            deleted_ids = [schrank_data['id'] for schrank_data in db_manager.pop_schranks_by_ids(found_ids)]
+            if deleted_ids:
+                print(f"Schrank/Schränke {', '.join(map(str, deleted_ids))} erfolgreich aus der Datenbank gelöscht.")
                 
                 # ---------- 6. Dateisystem-Bereinigung ----------
-                # Löscht das physische PNG-Bild, um Speicherplatz freizugeben
-                qr_gen.delete_qr_for_schrank(schrank_id)
+                # Löscht die physischen PNG-Bilder, um Speicherplatz freizugeben
+                for schrank_id in deleted_ids:
+                    qr_gen.delete_qr_for_schrank(schrank_id)
             else:
-                # Fallback: Sollte theoretisch nicht erreicht werden, da Check oben erfolgreich war
-                print(f"Fehler: Schrank {schrank_id} konnte nicht gelöscht werden.")
+                # Fallback: Nur erreichbar, wenn die Schränke zwischenzeitlich anderweitig gelöscht wurden
+                print(f"Fehler: Schrank/Schränke {', '.join(map(str, found_ids))} konnten nicht gelöscht werden.")
         else:
             print("Löschvorgang abgebrochen.")
 
     except Exception as e:
         print(f"Ein unerwarteter Fehler ist aufgetreten: {e}")
+    finally:
+        # Thread-Pool des Generators beenden (wie in add_schrank)
+        qr_gen.close()
 
 if __name__ == "__main__":
     delete_existing_schrank()
-
@@ -12,6 +12,20 @@ Diese Datei ist verantwortlich für alle grafischen Ausgaben (Rendering):
 Design-Notizen
 --------------
 - Zustandslosigkeit: Die Funktionen zeichnen immer den aktuellen Frame neu (Immediate Mode GUI).
+  Einzige Ausnahme ist der Bildpuffer von `MapRenderer`: Er stellt nur die im letzten Frame
+  übermalten Bereiche wieder her, statt den Grundriss pro Frame komplett zu kopieren.
+- Beschriftungen mit Outline werden einmalig vorgerendert und gecacht (`draw_label`),
+  pro Frame wird nur noch das fertige Sprite eingeblendet.
+- Kein `cv2.UMat`: Die Zeichenfunktionen (`circle`, `putText`, `polylines`, ...) haben keine
+  OpenCL-Kernel und würden den Puffer nur zwischen GPU und CPU hin- und herkopieren. Auf dem
+  Jetson gibt es zudem kein OpenCL. Die Bildpuffer bleiben deshalb NumPy-Arrays (die auch
+  `MapRenderer` per Slicing bearbeitet).
+- Kein JIT (Numba/Cython): Jede Form ist bereits ein einzelner OpenCV-Aufruf in C, der
+  Python-Anteil pro Objekt beschränkt sich auf wenige Attributzugriffe. Beschriftungen
+  kommen aus dem Sprite-Cache.
+- Tracer-Schweife werden vor dem Zeichnen per Ramer-Douglas-Peucker vereinfacht
+  (`TRAIL_EPSILON`): Stehende oder gerade fahrende Objekte liefern viele fast deckungsgleiche
+  Punkte, gezeichnet werden nur die Eckpunkte.
 - Trennung von Daten und Ansicht: Erhält nur die reinen Datenobjekte (Entities) und kümmert sich um Farben/Formen.
 - Fehlertoleranz: Die Karten-Projektion fängt Transformationsfehler ab, falls ein Objekt außerhalb des definierten Bereichs liegt.
 """
@@ -20,51 +34,82 @@ import cv2
 import numpy as np
 from config import BORDER_MARGIN
 
+# Schrift und Farben (BGR) einmalig als Modul-Konstanten
+_FONT = cv2.FONT_HERSHEY_SIMPLEX
+_BLACK = (0, 0, 0)
+_WHITE = (255, 255, 255)
+_RED = (0, 0, 255)
+_DARK_RED = (0, 0, 150)
+_GREEN = (0, 255, 0)
+_ORANGE = (0, 165, 255)
+_BLUE = (255, 0, 0)
+
+# [Pixel] Toleranz beim Vereinfachen der Tracer-Schweife (cv2.approxPolyDP)
+TRAIL_EPSILON = 1.5
+
+# Cache für vorgerenderte Beschriftungen mit Outline: (text, scale, color, outline) -> Sprite
+LABEL_CACHE_SIZE = 1024
+_label_cache = {}
+
 # ---------- 1. Kamera-Ansicht (Augmented Reality) ----------
 
-def draw_overlay(frame, width, height, active_entities):
+def _px(value, scale):
+    """Rechnet eine Pixel-Angabe der vollen Auflösung auf das (verkleinerte) Zielbild um."""
+    return int(round(value * scale))
+
+def draw_overlay(frame, width, height, active_entities, scale=1.0):
     """
     Hauptfunktion für das Zeichnen auf dem Kamerabild.
     Fügt die 'Kill-Zone', alle erkannten Objekte und globale Status-Texte hinzu.
+
+    `width`/`height` und die Objekt-Koordinaten beziehen sich auf die volle Kamera-Auflösung.
+    `scale` < 1: `frame` ist das verkleinerte Kamerabild, alle Koordinaten, Schriftgrößen
+    und Strichstärken werden mit diesem Faktor umgerechnet.
     """
     # A) Roter Kill-Zone Rahmen (Definiert den Bereich, in dem Tracking aktiv ist)
     cv2.rectangle(frame, 
-                  (BORDER_MARGIN, BORDER_MARGIN), 
-                  (width - BORDER_MARGIN, height - BORDER_MARGIN), 
-                  (0, 0, 255), 3)
-    cv2.putText(frame, "EXIT ZONE", (10, BORDER_MARGIN - 10), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                  (_px(BORDER_MARGIN, scale), _px(BORDER_MARGIN, scale)), 
+                  (_px(width - BORDER_MARGIN, scale), _px(height - BORDER_MARGIN, scale)), 
+                  _RED, max(_px(3, scale), 1))
+    # Statische Texte (ändern sich nie bzw. nur mit der Auflösung) kommen aus dem Sprite-Cache
+    draw_label(frame, "EXIT ZONE", (_px(10, scale), _px(BORDER_MARGIN - 10, scale)), 0.7 * scale, _RED, 0)
 
     # B) Entities zeichnen (Iteriert über alle getrackten Objekte)
     for entity in active_entities.values():
-        draw_entity(frame, entity)
+        draw_entity(frame, entity, scale)
 
     # C) Globale Info-Texte (HUD)
-    cv2.putText(frame, f"Objects: {len(active_entities)}", (30, 50), 
-                cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 0), 3)
-    cv2.putText(frame, f"Res: {width}x{height}", (30, height - 30), 
-                cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    cv2.putText(frame, f"Objects: {len(active_entities)}", (_px(30, scale), _px(50, scale)), 
+                _FONT, 1.5 * scale, _GREEN, max(_px(3, scale), 1))
+    draw_label(frame, f"Res: {width}x{height}", (_px(30, scale), _px(height - 30, scale)), 1 * scale, _WHITE, 0)
 
-def draw_entity(frame, entity):
+def draw_entity(frame, entity, scale=1.0):
     """
     Hilfsfunktion: Zeichnet ein einzelnes Objekt inkl. Box, ID und Zeitstempel.
     Unterscheidet visuell zwischen aktiven (Grün) und inaktiven (Orange) Objekten.
+    `scale` wie bei `draw_overlay`.
     """
     x, y, w, h = entity.box
     
     # Farbwahl: Grün = Aktiv (im Bild), Orange = Inaktiv (verloren/verdeckt)
-    color = (0, 255, 0) if entity.active else (0, 165, 255)
-    thickness = 4 if entity.active else 2
+    color = _GREEN if entity.active else _ORANGE
+    thickness = max(_px(4 if entity.active else 2, scale), 1)
     
     # Geometrie zeichnen (Bevorzugt Polygon wenn verfügbar, sonst Rechteck)
-    if entity.points is not None and len(entity.points) == 4:
-        cv2.polylines(frame, [entity.points], True, color, thickness)
-        # Text-Position über dem ersten Punkt
-        tx, ty = entity.points[0][0][0], entity.points[0][0][1] - 10
+    points = entity.points
+    if points is not None and points.shape[0] == 4:
+        if scale != 1.0:
+            points = (points * scale).round().astype(np.int32)
+        cv2.polylines(frame, [points], True, color, thickness)
+        # Text-Position über dem ersten Punkt (einmal entpackt, als Python-Ints)
+        tx, ty = points[0, 0].tolist()
     else:
+        if scale != 1.0:
+            x, y, w, h = (_px(v, scale) for v in (x, y, w, h))
         cv2.rectangle(frame, (x, y), (x + w, y + h), color, thickness)
         # Text-Position über der Bounding Box
-        tx, ty = x, y - 10
+        tx, ty = x, y
+    ty -= _px(10, scale)
 
     # Text-Inhalte vorbereiten
     text_line1 = f"Schrank Nr.{entity.uid}"
@@ -74,68 +119,167 @@ def draw_entity(frame, entity):
 
     # Text-Rendering mit Outline (Schwarzer Rand für bessere Lesbarkeit auf hellem Grund)
     # Zeile 1: ID
-    cv2.putText(frame, text_line1, (tx, ty), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 8)   # Outline
-    cv2.putText(frame, text_line1, (tx, ty), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)       # Text
+    draw_label(frame, text_line1, (tx, ty), 1 * scale, color, max(_px(8, scale), 1))
     
     # Zeile 2: Timer
-    cv2.putText(frame, text_line2, (tx, ty - 35), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 6) # Outline
-    cv2.putText(frame, text_line2, (tx, ty - 35), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2) # Text
+    draw_label(frame, text_line2, (tx, ty - _px(35, scale)), 0.8 * scale, _WHITE,
+               max(_px(6, scale), 1))
+
+def _render_label(text, scale, color, outline):
+    """
+    Rendert einen Text mit schwarzer Outline (outline = 0: ohne) einmalig in ein kleines Sprite.
+    Rückgabe: (offset, gain, ox, oy) - (ox, oy) ist die Text-Position innerhalb des Sprites.
+
+    Das Sprite wird auf schwarzem und weißem Grund gerendert. Daraus ergibt sich pro Pixel
+    `ergebnis = offset + hintergrund * gain / 255`, das gilt auch für geglättete Kanten.
+    """
+    pad = max(outline, 2) # Breitester Strich (Outline oder Text mit Stärke 2)
+    (tw, th), baseline = cv2.getTextSize(text, _FONT, scale, pad)
+    ox, oy = pad, pad + th
+    size = (th + baseline + 2 * pad, tw + 2 * pad, 3)
+
+    on_black = np.zeros(size, dtype=np.uint8)
+    on_white = np.full(size, 255, dtype=np.uint8)
+    for sprite in (on_black, on_white):
+        if outline:
+            cv2.putText(sprite, text, (ox, oy), _FONT, scale, _BLACK, outline) # Outline
+        cv2.putText(sprite, text, (ox, oy), _FONT, scale, color, 2)        # Text
+
+    gain = on_white.astype(np.uint16) - on_black
+    return on_black.astype(np.uint16), gain, ox, oy
+
+def draw_label(frame, text, org, scale, color, outline):
+    """
+    Zeichnet Text mit Outline wie zwei `cv2.putText`-Aufrufe (Outline + Text).
+    Mit outline = 0 entspricht es einem einzelnen `cv2.putText` mit Strichstärke 2.
+    Wiederkehrende Beschriftungen (IDs, Timer) werden aus dem Cache nur noch eingeblendet.
+    """
+    key = (text, scale, color, outline)
+    entry = _label_cache.get(key)
+    if entry is None:
+        if len(_label_cache) >= LABEL_CACHE_SIZE:
+            _label_cache.clear()
+        entry = _label_cache[key] = _render_label(text, scale, color, outline)
+    offset, gain, ox, oy = entry
+
+    # Sprite auf das Bild legen (am Bildrand beschnitten)
+    x0, y0 = int(org[0]) - ox, int(org[1]) - oy
+    h, w = gain.shape[:2]
+    fx0, fy0 = max(x0, 0), max(y0, 0)
+    fx1, fy1 = min(x0 + w, frame.shape[1]), min(y0 + h, frame.shape[0])
+    if fx0 >= fx1 or fy0 >= fy1:
+        return
+    sub = np.s_[fy0 - y0:fy1 - y0, fx0 - x0:fx1 - x0]
+    roi = frame[fy0:fy1, fx0:fx1]
+    roi[...] = (roi * gain[sub] + 127) // 255 + offset[sub]
 
 # ---------- 2. Grundriss-Ansicht (Top-Down Map) ----------
 
-def draw_map_view(map_img, active_entities, transformation_matrix):
+class MapRenderer:
     """
-    Projiziert die Kamerapositionen auf einen statischen Grundriss.
-    
-    Argumente:
-    - map_img: Das Hintergrundbild des Raumes.
-    - transformation_matrix: Die Homographie-Matrix für die Perspektiv-Transformation.
+    Zeichnet die Grundriss-Ansicht in einen dauerhaften Bildpuffer.
+
+    Statt den Grundriss in jedem Frame komplett zu kopieren, merkt sich der Renderer
+    die übermalten Bereiche (Dirty Rects) und stellt nur diese aus dem Original wieder her.
+    Das von `render()` gelieferte Bild wird beim nächsten Aufruf weiterverwendet.
     """
-    # Kopie erstellen, um das Original-Bild nicht zu übermalen
-    display_img = map_img.copy()
-    
-    h_map, w_map = display_img.shape[:2]
 
-    # Info Text oben links im Kartenfenster
-    cv2.putText(display_img, f"Aktive Objekte: {len(active_entities)}", (20, 40), 
-                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+    def __init__(self, map_img):
+        self.map_img = map_img
+        self._buf = map_img.copy()
+        self._dirty = [] # (x0, y0, x1, y1) der im letzten Frame übermalten Bereiche
 
-    for entity in active_entities.values():
-        if not entity.active:
-            continue 
-
-        # 1. Fußpunkt berechnen (Mitte unten der Bounding Box)
-        # Das ist physikalisch der Punkt, wo das Objekt den Boden berührt.
-        x, y, w, h = entity.box
-        center_x = x + w / 2
-        center_y = y + h 
-        
-        # 2. Transformation (Kamera-Koordinaten -> Karten-Koordinaten)
-        cam_point = np.array([[[center_x, center_y]]], dtype=np.float32)
-        
-        try:
-            map_point = cv2.perspectiveTransform(cam_point, transformation_matrix)
-            mx = int(map_point[0][0][0])
-            my = int(map_point[0][0][1])
+    def _restore(self):
+        """Kopiert die zuletzt übermalten Bereiche aus dem Original-Grundriss zurück."""
+        for x0, y0, x1, y1 in self._dirty:
+            self._buf[y0:y1, x0:x1] = self.map_img[y0:y1, x0:x1]
+        self._dirty = []
+
+    def _mark(self, x0, y0, x1, y1):
+        """Merkt einen (auf das Bild beschnittenen) Bereich für die nächste Wiederherstellung."""
+        h, w = self._buf.shape[:2]
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(w, x1), min(h, y1)
+        if x0 < x1 and y0 < y1:
+            self._dirty.append((x0, y0, x1, y1))
+
+    def _put_text(self, text, org, scale, color, thickness):
+        """cv2.putText inkl. Vormerken der Text-Fläche (plus Strichstärke als Rand)."""
+        cv2.putText(self._buf, text, org, _FONT, scale, color, thickness)
+        (tw, th), baseline = cv2.getTextSize(text, _FONT, scale, thickness)
+        x, y = org
+        pad = thickness + 2
+        self._mark(x - pad, y - th - pad, x + tw + pad, y + baseline + pad)
+
+    def render(self, active_entities, transformation_matrix, trails=(), actives=None, map_points=None):
+        """
+        Projiziert die Kamerapositionen auf den Grundriss.
+
+        Argumente:
+        - active_entities: {uid -> QREntity}, gezeichnet werden nur aktive Objekte.
+        - transformation_matrix: Die Homographie-Matrix für die Perspektiv-Transformation.
+        - trails: Liste von (N, 1, 2) int32-Arrays (Tracer-Schweife in Karten-Koordinaten).
+        - actives: Optional die bereits gefilterte Liste der aktiven Objekte (spart das
+          erneute Filtern, wenn der Aufrufer sie ohnehin hat).
+        - map_points: Optional die bereits transformierten Karten-Koordinaten [(x, y), ...]
+          in der Reihenfolge von `actives` (spart die Transformation pro Frame).
+        """
+        self._restore()
+        display_img = self._buf
+
+        h_map, w_map = display_img.shape[:2]
 
+        # Info Text oben links im Kartenfenster
+        self._put_text(f"Aktive Objekte: {len(active_entities)}", (20, 40), 1, _BLACK, 2)
+
+        if actives is None:
+            actives = [entity for entity in active_entities.values() if entity.active]
+        if not actives:
+            return display_img
+
+        if map_points is None:
+            # 1. Fußpunkte berechnen (Mitte unten der Bounding Box)
+            # Das ist physikalisch der Punkt, wo das Objekt den Boden berührt.
+            cam_points = np.array([(e.box[0] + e.box[2] / 2, e.box[1] + e.box[3]) for e in actives],
+                                  dtype=np.float32).reshape(-1, 1, 2)
+
+            # 2. Transformation (Kamera-Koordinaten -> Karten-Koordinaten), ein Aufruf für alle Objekte
+            try:
+                map_points = cv2.perspectiveTransform(cam_points, transformation_matrix)
+            except Exception as e:
+                print(f"Transform Error: {e}")
+                return display_img
+            map_points = map_points.reshape(-1, 2).astype(np.int32).tolist()
+
+        for entity, (mx, my) in zip(actives, map_points):
             # 3. Zeichnen (nur wenn der Punkt innerhalb der Kartengrenzen liegt)
             if 0 <= mx < w_map and 0 <= my < h_map:
                 # Punkt markieren (Roter Punkt mit schwarzem Rand)
-                cv2.circle(display_img, (mx, my), 15, (0, 0, 255), -1) 
-                cv2.circle(display_img, (mx, my), 15, (0, 0, 0), 2)
+                cv2.circle(display_img, (mx, my), 15, _RED, -1) 
+                cv2.circle(display_img, (mx, my), 15, _BLACK, 2)
+                self._mark(mx - 17, my - 17, mx + 18, my + 18)
                 
                 # --- Beschriftung ---
                 # Zeile 1: ID
-                label_id = f"ID {entity.uid}"
-                cv2.putText(display_img, label_id, (mx + 20, my), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
+                self._put_text(f"ID {entity.uid}", (mx + 20, my), 0.7, _BLACK, 2)
                 
                 # Zeile 2: ZEIT (Visualisierung der Verweildauer)
-                label_time = entity.get_duration_string()
-                cv2.putText(display_img, label_time, (mx + 20, my + 25), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 150), 2) # Dunkelrot
+                self._put_text(entity.get_duration_string(), (mx + 20, my + 25), 0.7, _DARK_RED, 2) # Dunkelrot
 
-        except Exception as e:
-            print(f"Transform Error: {e}")
+        # 4. Tracer (Schweif) einzeichnen, alle Schweife in einem Aufruf
+        if trails:
+            # Vereinfachen (Abweichung höchstens TRAIL_EPSILON Pixel, bei Linienstärke 2 unsichtbar)
+            trails = [cv2.approxPolyDP(pts, TRAIL_EPSILON, False) for pts in trails]
+            cv2.polylines(display_img, trails, False, _BLUE, 2)
+            for pts in trails:
+                x, y, w, h = cv2.boundingRect(pts)
+                self._mark(x - 2, y - 2, x + w + 2, y + h + 2)
 
-    return display_img
+        return display_img
+
+def draw_map_view(map_img, active_entities, transformation_matrix):
+    """
+    Einmaliges Zeichnen der Grundriss-Ansicht auf eine neue Kopie von `map_img`.
+    Für die Hauptschleife `MapRenderer` verwenden (kein Kopieren pro Frame).
+    """
+    return MapRenderer(map_img).render(active_entities, transformation_matrix)
@@ -11,13 +11,27 @@ Diese Klasse verbindet die physische Welt mit der digitalen Datenbank:
 
 Design-Notizen
 --------------
-- Robustheit: Prüft vor dem Speichern/Löschen, ob Verzeichnisse oder Dateien existieren.
+- Robustheit: Legt den Ausgabeordner bei Bedarf an. Beim Löschen wird eine fehlende Datei
+  über `FileNotFoundError` erkannt statt vorher per `os.path.exists` geprüft.
 - Fehlerbehandlung: Fängt Dateisystem-Fehler (OSError) ab, um Programmabstürze zu vermeiden, wenn Dateien blockiert sind.
 - Flexibilität: Die Base-URL ist konfigurierbar, um auf verschiedene Server-Adressen (Localhost/Produktion) zu zeigen.
+- Hintergrund-Threads: Erzeugen und Speichern der Bilder läuft in einem Thread-Pool.
+  `create_qr_for_schrank` gibt ein Future zurück, mehrere Codes entstehen so parallel
+  (die PNG-Kompression gibt den GIL frei).
+- Bild direkt aus der Modul-Matrix: Die QR-Matrix wird per NumPy auf `box_size` skaliert und
+  als 1-Bit-PNG gespeichert (identisch zu `make_image()`, aber ohne Zeichnen Modul für Modul).
+- Lazy Import: `qrcode` (inkl. Pillow und NumPy) wird erst beim ersten Erzeugen eines Codes geladen.
+  Reine Lösch-Aufrufe (`delete_schrank.py`) starten so ohne die QR-Bibliotheken.
 """
 
-import qrcode
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Anzahl paralleler Worker für die QR-Erzeugung
+QR_WORKERS = min(4, os.cpu_count() or 1)
+
+# Längste unterstützte Schrank-ID (Stellen), bestimmt die feste QR-Version
+MAX_ID_DIGITS = 10
 
 class QRCodeGenerator:
     def __init__(self, output_dir="qr_codes", base_url="http://127.0.0.1:5000/schrank/"):
@@ -31,24 +45,93 @@ class QRCodeGenerator:
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
 
+        # QR-Vorlage, wird beim ersten Auftrag bestimmt (siehe _get_template_kwargs)
+        self._template_kwargs = None
+
+        # Worker-Threads werden erst beim ersten Auftrag gestartet
+        self._pool = ThreadPoolExecutor(max_workers=QR_WORKERS, thread_name_prefix="QRGen")
+
     # ---------- Erstellung ----------
 
     def create_qr_for_schrank(self, schrank_id):
         """
-        Generiert einen QR-Code für eine gegebene Schrank-ID.
+        Generiert einen QR-Code für eine gegebene Schrank-ID im Hintergrund.
         
         Der QR-Code enthält eine URL (z.B. .../schrank/12), die beim Scannen
         direkt zur Detailansicht des Objekts führt.
+
+        Rückgabe: Future; `.result()` liefert den Dateipfad (bzw. None bei Fehlern).
+        """
+        return self._pool.submit(self._make_and_save, schrank_id, self._get_template_kwargs())
+
+    def create_qr_for_schranks(self, schrank_ids):
+        """
+        Generiert die QR-Codes für mehrere Schrank-IDs (z.B. alle Codes neu erzeugen).
+        Die Vorlage wird nur einmal bestimmt, die Bilder entstehen parallel im Thread-Pool.
+
+        Rückgabe: Liste von Futures in der Reihenfolge von `schrank_ids`.
+        """
+        template_kwargs = self._get_template_kwargs()
+        return [self._pool.submit(self._make_and_save, schrank_id, template_kwargs)
+                for schrank_id in schrank_ids]
+
+    def _get_template_kwargs(self):
+        """
+        QR-Vorlage: Alle URLs haben dasselbe Präfix, die Version (Größe) wird daher einmal
+        für die längste mögliche URL bestimmt. Danach entfällt die Versionssuche pro Code.
         """
-        url = f"{self.base_url}{schrank_id}"
+        if self._template_kwargs is None:
+            import qrcode # Lazy Import, siehe Design-Notizen
+
+            probe = qrcode.QRCode()
+            self._add_url(probe, '9' * MAX_ID_DIGITS)
+            probe.make(fit=True)
+            self._template_kwargs = dict(
+                version=probe.version,
+                error_correction=qrcode.constants.ERROR_CORRECT_M, # Default von qrcode.make()
+                box_size=10,
+                border=4,
+            )
+        return self._template_kwargs
+
+    def _add_url(self, qr, schrank_id):
+        """
+        Fügt die URL als zwei feste Segmente hinzu statt als String (keine Modus-Erkennung):
+        Präfix im Byte-Modus, die ID im Numerik-Modus (3 Ziffern in 10 Bit statt 24 Bit).
+        Beim Scannen ergibt sich dieselbe URL.
+        """
+        from qrcode.util import QRData, MODE_8BIT_BYTE, MODE_NUMBER
+
+        id_str = str(schrank_id)
+        if not id_str.isdigit():
+            qr.add_data(f"{self.base_url}{id_str}") # Fallback: automatische Segmentierung
+            return
+        qr.add_data(QRData(self.base_url.encode("utf-8"), mode=MODE_8BIT_BYTE, check_data=False))
+        qr.add_data(QRData(id_str.encode("ascii"), mode=MODE_NUMBER, check_data=False))
+
+    def _make_and_save(self, schrank_id, template_kwargs):
+        """Erzeugt das QR-Bild und speichert es als PNG (läuft in einem Worker-Thread)."""
+        import qrcode # Bereits durch _get_template_kwargs geladen
+        import numpy as np
+        from PIL import Image
+
         try:
             # Dateipfad konstruieren
             filename = f"schrank_{schrank_id}.png"
             filepath = os.path.join(self.output_dir, filename)
             
-            # QR-Code erzeugen und speichern
-            img = qrcode.make(url)
-            img.save(filepath)
+            # QR-Code mit fester Version erzeugen (fit=False: keine Versionssuche) und speichern
+            qr = qrcode.QRCode(**template_kwargs)
+            self._add_url(qr, schrank_id)
+            qr.make(fit=False)
+
+            # Matrix inkl. Rand (True = dunkles Modul) -> jedes Modul wird zu box_size x box_size Pixeln
+            box_size = template_kwargs["box_size"]
+            modules = np.array(qr.get_matrix(), dtype=bool)
+            pixels = np.repeat(np.repeat(~modules, box_size, axis=0), box_size, axis=1)
+            img = Image.fromarray(pixels) # bool -> 1-Bit-Bild (Modus "1"), wie make_image()
+            # Schnellste zlib-Stufe: Bei zweifarbigen QR-Bildern kaum größer als Stufe 6
+            img.save(filepath, compress_level=1)
             
             return filepath
         except Exception as e:
@@ -66,13 +149,16 @@ class QRCodeGenerator:
             filename = f"schrank_{schrank_id}.png"
             filepath = os.path.join(self.output_dir, filename)
             
-            # Prüfen, ob die Datei existiert, bevor wir sie löschen
-            if os.path.exists(filepath):
-                os.remove(filepath)
-                print(f"QR-Code-Datei {filepath} gelöscht.")
-            else:
-                print(f"QR-Code-Datei für ID {schrank_id} nicht gefunden, nichts zu löschen.")
-        
+            # Direkt löschen statt vorher zu prüfen (ein Systemaufruf statt zwei)
+            os.remove(filepath)
+            print(f"QR-Code-Datei {filepath} gelöscht.")
+
+        except FileNotFoundError:
+            print(f"QR-Code-Datei für ID {schrank_id} nicht gefunden, nichts zu löschen.")
         except OSError as e:
             # OSError fängt Fehler ab, z.B. wenn die Datei gerade geöffnet/gesperrt ist
             print(f"Fehler beim Löschen der QR-Code-Datei: {e}")
+
+    def close(self):
+        """Wartet auf alle laufenden Aufträge und beendet den Thread-Pool."""
+        self._pool.shutdown(wait=True)
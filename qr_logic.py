@@ -8,7 +8,7 @@ Diese Klasse verwaltet die Identität und den Status aller erkannten QR-Codes:
 1. Identitäts-Management: Extrahiert die Datenbank-ID aus dem QR-Link.
 2. Lebenszyklus: Unterscheidet zwischen "Neu", "Aktiv", "Verloren" (Memory) und "Historie" (Friedhof).
 3. API-Bridge: Meldet Statusänderungen (Gesehen/Verloren) direkt an die Datenbank-Logik.
-4. Persistenz: Schreibt den aktuellen Status in eine JSON-Datei für die GUI.
+4. Persistenz: Schreibt den aktuellen Status in die Datenbank-Tabelle 'qr_state' (für GUIs).
 
 Design-Notizen
 --------------
@@ -16,23 +16,64 @@ Design-Notizen
 - Wiederbelebung (Resurrection): Objekte, die kurz verschwinden und wieder auftauchen, 
   behalten ihre ursprüngliche Startzeit (Session-Dauer läuft weiter).
 - Kill-Zone: Objekte am Bildrand werden sofort entfernt, um "Geister-Tracking" beim Hinaustragen zu verhindern.
-- API-Trigger: Die Funktionen `schrank_gesehen` und `schrank_verloren` werden ereignisgesteuert aufgerufen.
+- API-Trigger: Gesehen/Verloren-Ereignisse werden pro Frame gesammelt und gemeinsam per
+  `schrank_batch_update` gemeldet (eine DB-Transaktion statt einer pro Ereignis).
+- Geometrie skalar: Die Kill-Zone rechnet direkt auf den Box-Tupeln. Bei den
+  wenigen Objekten pro Frame wäre NumPy langsamer (allein das Anlegen des Arrays kostet mehr).
+- Logging statt print: Ereignisse gehen an den Logger 'qr_logic' (Level INFO). Die Texte
+  werden erst formatiert, wenn das Level aktiv ist. Die Konsolen-Ausgabe konfiguriert
+  das Hauptprogramm (`tracking_main.py`).
+- Status-Tabelle statt JSON: Pro Frame werden nur die betroffenen Zeilen per Upsert/Delete
+  geändert, statt eine komplette Datei neu zu schreiben.
+- Entprelltes Schreiben: Reine Positions-Updates landen höchstens alle `STATE_FLUSH_INTERVAL`
+  Sekunden in der Tabelle, neue oder entfernte Objekte sofort.
+- Schreib-Thread: Die Tabelle wird in einem Hintergrund-Thread geschrieben, der Tracking-Loop
+  wartet nie auf die Festplatte. Ist der Thread im Rückstand, zählt nur der neueste Stand
+  (entfernte IDs älterer Stände werden übernommen, damit keine Zeile liegen bleibt).
 """
 
-import json
 import time
 import math
-import os
+import logging
+import threading
 from datetime import datetime
-from config import MEMORY_TOLERANCE, BORDER_MARGIN, MAX_TRACKING_DISTANCE, HISTORY_DURATION, RECOVERY_DISTANCE
+from functools import lru_cache
+from config import MEMORY_TIMEOUT, BORDER_MARGIN, HISTORY_DURATION, STATE_FLUSH_INTERVAL
 
 # API-Schnittstelle zur Datenbank
-from tracking_api import schrank_gesehen, schrank_verloren
+from tracking_api import schrank_batch_update
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=512)
+def extract_id_from_url(content):
+    """
+    Parser-Logik: Extrahiert die reine ID aus dem QR-String.
+    Erwartet Format: '.../schrank/12' oder einfach '12'.
+    Gecacht, da dieselben QR-Strings in jedem Frame wiederkehren.
+    """
+    # Bei einer URL das Stück nach dem letzten '/' nehmen, sonst den ganzen String
+    possible_id = content.rpartition("/")[2] or content
+    try:
+        return int(possible_id)
+    except ValueError:
+        return None
 
 class QREntity:
     """Repräsentiert ein einzelnes getracktes Objekt (Schrank)."""
+
+    # Feste Attribute statt __dict__: weniger Speicher pro Objekt, schnellerer Zugriff
+    __slots__ = (
+        "uid", "content", "box", "points",
+        "start_time", "_first_seen_str", "last_seen_time", "active",
+        "_duration_sec", "_duration_str",
+    )
     
-    def __init__(self, uid, content, box, original_start_time=None):
+    def __init__(self, uid, content, box, original_start_time=None, now=None):
+        """`now`: Zeitstempel des aktuellen Frames (spart den eigenen time.time()-Aufruf)."""
+        if now is None:
+            now = time.time()
+
         self.uid = uid          # ECHTE Datenbank-ID (z.B. 12)
         self.content = content  # Der volle Link (Raw Data)
         self.box = box
@@ -42,89 +83,124 @@ class QREntity:
         if original_start_time:
             self.start_time = original_start_time
         else:
-            self.start_time = time.time()
+            self.start_time = now
             
-        self.first_seen_str = datetime.fromtimestamp(self.start_time).strftime("%Y-%m-%d %H:%M:%S")
-        self.last_seen_time = time.time()
-        self.missing_frames = 0
+        self._first_seen_str = None # Wird erst beim ersten Lesen formatiert
+        self.last_seen_time = now
         self.active = True
 
-    def update(self, box, points):
-        """Aktualisiert Position und setzt den Timeout-Counter zurück."""
+        # Cache für get_duration_string(): (volle Sekunden, "MM:SS")
+        self._duration_sec = None
+        self._duration_str = ""
+
+    @property
+    def first_seen_str(self):
+        """Startzeit als Text (strftime nur einmal, beim ersten Zugriff)."""
+        if self._first_seen_str is None:
+            self._first_seen_str = datetime.fromtimestamp(self.start_time).strftime("%Y-%m-%d %H:%M:%S")
+        return self._first_seen_str
+
+    def update(self, box, points, now=None):
+        """Aktualisiert Position und Zeitpunkt der letzten Sichtung (Basis für den Timeout)."""
         self.box = box
         self.points = points
-        self.last_seen_time = time.time()
-        self.missing_frames = 0
+        self.last_seen_time = time.time() if now is None else now
         self.active = True
 
     def mark_missing(self):
-        """Erhöht den Zähler für verpasste Frames (Grace Period)."""
-        self.missing_frames += 1
+        """Markiert das Objekt als nicht sichtbar (Timeout läuft über last_seen_time)."""
         self.active = False
     
-    def get_duration_string(self):
-        """Formatiert die Verweildauer als MM:SS String."""
-        elapsed = time.time() - self.start_time
-        minutes = int(elapsed // 60)
-        seconds = int(elapsed % 60)
-        return f"{minutes:02}:{seconds:02}"
+    def get_duration_string(self, now=None):
+        """
+        Formatiert die Verweildauer als MM:SS String.
+        Neu formatiert wird nur, wenn eine volle Sekunde vergangen ist (GUI fragt pro Frame).
+        """
+        if now is None:
+            now = time.time()
+        elapsed = int(now - self.start_time)
+        if elapsed != self._duration_sec:
+            minutes, seconds = divmod(elapsed, 60)
+            self._duration_sec = elapsed
+            self._duration_str = f"{minutes:02}:{seconds:02}"
+        return self._duration_str
 
 class QRManager:
-    def __init__(self, json_path):
+    def __init__(self, db):
         """
         Initialisiert den Manager.
         
         Args:
-            json_path: Pfad zur JSON-Datei für den Datenaustausch mit der GUI.
+            db: DatabaseManager für den Datenaustausch mit der GUI (Tabelle 'qr_state').
         """
-        self.json_path = json_path
+        self.db = db
         self.entities = {}  # Aktive Objekte (Live + Memory Grace Period)
         self.history = {}   # "Friedhof" für kurzzeitig verlorene Objekte (für Wiederbelebung)
+        self._last_state_flush = 0.0 # Zeitpunkt des letzten write_state()
+        self._next_history_expiry = math.inf # Frühester Zeitpunkt, an dem ein History-Eintrag abläuft
         
-        # Sicherstellen, dass die JSON-Datei existiert (verhindert GUI-Fehler)
-        self.ensure_json_exists()
+        # Status-Tabelle sicherstellen und Zustand vom letzten Lauf verwerfen
+        self.db.create_qr_state_table()
+        self.db.clear_qr_state()
+
+        # Hintergrund-Schreiber für 'qr_state': hält nur den neuesten, noch offenen Stand
+        self._pending_state = None # (rows, removed_uids) oder None
+        self._state_cond = threading.Condition()
+        self._writer_running = True
+        self._writer = threading.Thread(target=self._state_writer_loop, name="QRStateWriter", daemon=True)
+        self._writer.start()
 
     # ---------- Helper Funktionen ----------
 
-    def ensure_json_exists(self):
-        if not os.path.exists(self.json_path):
-            self.write_json([])
+    def write_state(self, removed_uids):
+        """
+        Übergibt den aktuellen Status aller Entities an den Schreib-Thread (blockiert nicht).
+        Der Thread schreibt ihn in einer Transaktion in die Datenbank.
+        """
+        rows = []
+        for uid, entity in self.entities.items():
+            x, y, w, h = entity.box
+            rows.append((
+                uid,
+                entity.content,
+                entity.first_seen_str,
+                entity.last_seen_time,
+                "LIVE" if entity.active else "MEMORY",
+                int(x), int(y), int(w), int(h)
+            ))
 
-    def write_json(self, data_list):
-        try:
-            with open(self.json_path, 'w') as f:
-                json.dump(data_list, f, indent=4)
-        except Exception:
-            pass
+        with self._state_cond:
+            if self._pending_state is not None:
+                # Älterer Stand noch nicht geschrieben: wird ersetzt, seine entfernten IDs bleiben
+                removed_uids = set(self._pending_state[1]).union(removed_uids)
+            self._pending_state = (rows, list(removed_uids))
+            self._state_cond.notify()
 
-    def is_in_kill_zone(self, box, img_w, img_h):
-        """Prüft, ob ein Objekt den Bildrand berührt (Indikator für Verlassen des Bereichs)."""
-        x, y, w, h = box
-        if x < BORDER_MARGIN or y < BORDER_MARGIN: return True
-        if (x + w) > (img_w - BORDER_MARGIN) or (y + h) > (img_h - BORDER_MARGIN): return True
-        return False
+    def _state_writer_loop(self):
+        """Schreib-Thread: Schreibt jeweils den neuesten offenen Stand, bis close() aufgerufen wird."""
+        while True:
+            with self._state_cond:
+                self._state_cond.wait_for(lambda: self._pending_state is not None or not self._writer_running)
+                state, self._pending_state = self._pending_state, None
+            if state is None:
+                return # Beendet und nichts mehr offen
+            rows, removed_uids = state
+            self.db.update_qr_state(rows, removed_uids)
 
-    def calculate_distance(self, box1, box2):
-        """Euklidische Distanz zwischen zwei Box-Mittelpunkten."""
-        c1_x, c1_y = box1[0] + box1[2]/2, box1[1] + box1[3]/2
-        c2_x, c2_y = box2[0] + box2[2]/2, box2[1] + box2[3]/2
-        return math.hypot(c2_x - c1_x, c2_y - c1_y)
+    def close(self):
+        """Beendet den Schreib-Thread, nachdem der letzte offene Stand geschrieben wurde."""
+        with self._state_cond:
+            self._writer_running = False
+            self._state_cond.notify()
+        self._writer.join()
 
-    def extract_id_from_url(self, content):
+    def is_in_kill_zone(self, box, margin, x_max, y_max):
         """
-        Parser-Logik: Extrahiert die reine ID aus dem QR-String.
-        Erwartet Format: '.../schrank/12' oder einfach '12'.
+        Prüft, ob ein Objekt den Bildrand berührt (Indikator für Verlassen des Bereichs).
+        `x_max`/`y_max` sind die inneren Grenzen (Bildgröße minus Rand), einmal pro Frame berechnet.
         """
-        try:
-            # Wenn es eine URL ist, splitte am '/' und nimm das letzte Element
-            if "/" in content:
-                possible_id = content.split("/")[-1]
-                return int(possible_id)
-            else:
-                # Wenn es nur eine Zahl ist
-                return int(content)
-        except ValueError:
-            return None
+        x, y, w, h = box
+        return x < margin or y < margin or (x + w) > x_max or (y + h) > y_max
 
     # ---------- Hauptlogik (Process Loop) ----------
 
@@ -133,113 +209,129 @@ class QRManager:
         Verarbeitet einen Frame: Matcht Erkennungen gegen existierende Objekte.
         
         Ablauf:
-        1. Update: Aktualisiere bekannte IDs.
-        2. Neu/Wiederbelebung: Behandle neue IDs (Check gegen History).
-        3. Aufräumen: Prüfe Timeouts und Kill-Zones -> API Calls.
+        1./2. Update bzw. Neu/Wiederbelebung: Ein Durchlauf über alle Erkennungen
+              (bekannte IDs aktualisieren, neue IDs gegen die History prüfen).
+        3. Aufräumen: Prüfe Timeouts und Kill-Zones.
         4. Garbage Collection: Lösche alte History-Einträge.
-        5. Export: Schreibe GUI-Daten.
+        5. API: Gesammelte Gesehen/Verloren-Ereignisse in einem Aufruf melden.
+        6. Export: Schreibe GUI-Daten (Tabelle 'qr_state').
         """
         current_time = time.time()
+
+        # Leerlauf: Nichts erkannt, nichts getrackt, nichts in der History -> nichts zu tun
+        # (die Status-Tabelle ist dann bereits leer, Entfernungen werden sofort geschrieben)
+        if not detected_contents and not self.entities and not self.history:
+            return self.entities
         
-        existing_uids = list(self.entities.keys())
-        matched_indices = set()
+        entities_added = False # Neue/wiederbelebte Objekte -> Status sofort schreiben
+        seen_ids = set()       # In diesem Frame erkannte IDs
+        api_seen = []          # Ereignisse für schrank_batch_update (Ende des Frames)
+        api_lost = []
 
-        # --- 1. NORMALES TRACKING (Frame zu Frame Update) ---
-        for i, new_box in enumerate(detected_boxes):
-            new_content = detected_contents[i]
-            
+        # --- 1./2. TRACKING-UPDATE, NEUE OBJEKTE & WIEDERBELEBUNG (ein Durchlauf) ---
+        for new_content, new_box, new_points in zip(detected_contents, detected_boxes, detected_points):
             # Versuche ID zu extrahieren
-            qr_id = self.extract_id_from_url(new_content)
+            qr_id = extract_id_from_url(new_content)
             if qr_id is None: 
                 continue # Kein gültiger QR-Code für unser System
+            seen_ids.add(qr_id)
+
+            # Fall 1: ID wird bereits aktiv getrackt -> Update existierende Entity
+            entity = self.entities.get(qr_id)
+            if entity is not None:
+                entity.update(new_box, new_points, current_time)
 
-            # Prüfen, ob diese ID bereits aktiv getrackt wird
-            if qr_id in self.entities:
-                # Update existierende Entity
-                self.entities[qr_id].update(new_box, detected_points[i])
-                if qr_id in existing_uids:
-                    existing_uids.remove(qr_id)
-                matched_indices.add(i)
-
-        # --- 2. NEUE OBJEKTE & WIEDERBELEBUNG ---
-        for i, new_box in enumerate(detected_boxes):
-            if i not in matched_indices:
-                new_content = detected_contents[i]
-                qr_id = self.extract_id_from_url(new_content)
+            # Fall 2A: Ist es im Friedhof (History)? -> WIEDERBELEBUNG
+            elif qr_id in self.history:
+                old_entity = self.history.pop(qr_id)
+                logger.info(">>> RESURRECT: ID #%s ist zurück!", qr_id)
+                
+                # API TRIGGER: Status auf "active" setzen (gesammelt)
+                api_seen.append(qr_id)
+
+                # Altes Objekt weiterverwenden: Startzeit bleibt, formatierte Texte
+                # (Startzeit, Dauer) müssen nicht neu erzeugt werden
+                old_entity.content = new_content
+                old_entity.update(new_box, new_points, current_time)
+                self.entities[qr_id] = old_entity
+                entities_added = True
+            
+            # Fall 2B: Ganz neu
+            else:
+                logger.info(">>> NEU ENTDECKT: ID #%s", qr_id)
                 
-                if qr_id is None: continue
-
-                # Fall A: Ist es im Friedhof (History)? -> WIEDERBELEBUNG
-                if qr_id in self.history:
-                    old_entity = self.history.pop(qr_id)
-                    print(f">>> RESURRECT: ID #{qr_id} ist zurück!")
-                    
-                    # API TRIGGER: Status auf "active" setzen
-                    schrank_gesehen(qr_id)
-
-                    resurrected = QREntity(qr_id, new_content, new_box, old_entity.start_time)
-                    resurrected.points = detected_points[i]
-                    self.entities[qr_id] = resurrected
+                # API TRIGGER: Status auf "active" setzen (gesammelt)
+                api_seen.append(qr_id)
                 
-                # Fall B: Ganz neu
-                else:
-                    print(f">>> NEU ENTDECKT: ID #{qr_id}")
-                    
-                    # API TRIGGER: Status auf "active" setzen
-                    schrank_gesehen(qr_id)
-                    
-                    self.entities[qr_id] = QREntity(qr_id, new_content, new_box)
+                self.entities[qr_id] = QREntity(qr_id, new_content, new_box, now=current_time)
+                entities_added = True
 
         # --- 3. VERLORENE OBJEKTE (Aufräumen) ---
         codes_to_move_to_history = []
+
+        # Konstanten einmal pro Frame als lokale Variablen (statt pro Objekt neu nachzuschlagen)
+        margin = BORDER_MARGIN
+        x_max = img_w - margin
+        y_max = img_h - margin
+        memory_timeout = MEMORY_TIMEOUT
+        history_duration = HISTORY_DURATION
         
-        # Alle IDs, die in DIESEM Frame nicht geupdatet wurden (übrig in existing_uids)
-        for uid in existing_uids:
+        # Alle getrackten IDs, die in DIESEM Frame nicht erkannt wurden (Mengen-Differenz).
+        # Neu angelegte Objekte stecken in seen_ids und fallen damit automatisch heraus.
+        for uid in self.entities.keys() - seen_ids:
             entity = self.entities[uid]
             entity.mark_missing()
             
             should_remove = False
             
             # Kriterium 1: Kill-Zone (Sofort raus, wenn am Rand verloren)
-            if self.is_in_kill_zone(entity.box, img_w, img_h):
-                print(f"<<< RAND-KILL: ID #{uid}")
+            if self.is_in_kill_zone(entity.box, margin, x_max, y_max):
+                logger.info("<<< RAND-KILL: ID #%s", uid)
                 should_remove = True
             
-            # Kriterium 2: Timeout (Zu lange nicht gesehen)
-            elif entity.missing_frames > MEMORY_TOLERANCE:
-                print(f"<<< TIMEOUT: ID #{uid}")
+            # Kriterium 2: Timeout (Zu lange nicht gesehen, in Sekunden)
+            elif current_time - entity.last_seen_time > memory_timeout:
+                logger.info("<<< TIMEOUT: ID #%s", uid)
                 should_remove = True
 
             if should_remove:
-                # API TRIGGER: Status auf "inactive" (Abgang) setzen
-                schrank_verloren(uid)
+                # API TRIGGER: Status auf "inactive" (Abgang) setzen (gesammelt)
+                api_lost.append(uid)
                 
                 codes_to_move_to_history.append(uid)
 
         # Verschiebe entfernte Objekte in die History (für mögliche Wiederbelebung)
         for uid in codes_to_move_to_history:
-            self.history[uid] = self.entities[uid]
-            del self.entities[uid]
+            entity = self.entities.pop(uid)
+            self.history[uid] = entity
+            self._next_history_expiry = min(self._next_history_expiry,
+                                            entity.last_seen_time + history_duration)
 
         # --- 4. HISTORY CLEANUP (Endgültiges Löschen) ---
-        history_to_delete = []
-        for uid, entity in self.history.items():
-            if (current_time - entity.last_seen_time) > HISTORY_DURATION:
-                history_to_delete.append(uid)
-        
-        for uid in history_to_delete:
-            del self.history[uid]
+        # Die History wird nur durchsucht, wenn der früheste Eintrag tatsächlich abgelaufen ist
+        if current_time > self._next_history_expiry:
+            history_to_delete = []
+            for uid, entity in self.history.items():
+                if (current_time - entity.last_seen_time) > history_duration:
+                    history_to_delete.append(uid)
+            
+            for uid in history_to_delete:
+                del self.history[uid]
 
-        # --- 5. JSON UPDATE (Datenübergabe an GUI) ---
-        json_output = []
-        for uid, entity in self.entities.items():
-            json_output.append({
-                "internal_id": uid,
-                "content": entity.content,
-                "duration": entity.get_duration_string(),
-                "timestamp": entity.first_seen_str,
-                "status": "LIVE" if entity.active else "MEMORY"
-            })
-        self.write_json(json_output)
+            # Nächsten Ablaufzeitpunkt aus den verbliebenen Einträgen bestimmen
+            self._next_history_expiry = min(
+                (entity.last_seen_time + history_duration for entity in self.history.values()),
+                default=math.inf)
+
+        # --- 5. API-Ereignisse gesammelt an die Datenbank melden ---
+        schrank_batch_update(api_seen, api_lost)
+
+        # --- 6. STATUS UPDATE (Datenübergabe an GUI) ---
+        # Sofort bei geänderter Objekt-Menge, sonst nur im Intervall (reine Positions-Updates).
+        # Entfernte IDs werden immer sofort geschrieben, gehen also nie verloren.
+        if (entities_added or codes_to_move_to_history
+                or current_time - self._last_state_flush >= STATE_FLUSH_INTERVAL):
+            self.write_state(codes_to_move_to_history)
+            self._last_state_flush = current_time
         
         return self.entities
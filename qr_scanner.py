@@ -0,0 +1,297 @@
+# qr_scanner.py
+"""
+QR-Scanner / Dekodierung der Kamerabilder.
+
+Zweck
+-----
+Diese Datei kapselt das Auslesen der QR-Codes aus einem Graubild:
+1. Dekodierung: Findet alle QR-Codes im Bild und liefert Inhalt, Bounding-Box und Eckpunkte.
+2. Warm-Instanz: Der ZBar-Scanner wird einmal erstellt und für jeden Frame wiederverwendet.
+3. Pipelining: `QRWorker` dekodiert in einem eigenen Thread, während der Hauptthread
+   bereits den nächsten Frame holt und die GUI zeichnet.
+
+Design-Notizen
+--------------
+- Wiederverwendung: `pyzbar.decode()` erzeugt bei JEDEM Aufruf einen neuen ZBar-Scanner
+  und konfiguriert ihn neu. Hier wird der Scanner einmalig angelegt (nur QR aktiviert,
+  alle Barcode-Symbologien aus) und danach nur noch mit Bildern gefüttert.
+- Zero-Copy: Das NumPy-Graubild wird per Pointer an ZBar übergeben, statt es mit
+  `tobytes()` zu kopieren.
+- Kompatibilität: Liefert dieselben `Decoded`-Tupel wie `pyzbar.decode()`.
+- pyzbar-Version: Der wiederverwendete Scanner nutzt interne Namen von pyzbar 0.1.9
+  (`_image`, `_decode_symbols`, ...). Fehlen sie in einer anderen Version, fällt
+  `QRScanner` auf das öffentliche `pyzbar.decode()` zurück (langsamer, aber lauffähig).
+- Optionales Backend: Mit `QR_BACKEND = "wechat"` dekodiert zuerst `WeChatScanner`
+  (opencv-contrib, eine langlebige Instanz). Findet er nichts, wird ZBar gefragt.
+  Ohne opencv-contrib bleibt es bei ZBar.
+- Threading: Ein ZBar-Scanner ist nicht thread-sicher -> pro Thread eine eigene Instanz.
+- Veraltete Frames verwerfen: Eingang und Ausgang des Workers fassen je nur EIN Element.
+  Ist der Decoder langsamer als die Kamera, wird immer der neueste Frame dekodiert.
+- Wiederverwendete Puffer: `submit()` kopiert den Frame in einen Puffer aus einer Frei-Liste.
+  Dekodierte oder verworfene Puffer kommen zurück in die Liste, im Betrieb kreisen so
+  höchstens drei Puffer (schreiben, wartend, dekodieren) statt einer Allokation pro Frame.
+- Scan-Bereich: Optional wird nur ein Ausschnitt (ROI, NumPy-View) dekodiert. Der Versatz
+  wird in `parse_detections` wieder addiert, die Koordinaten beziehen sich aufs ganze Bild.
+- Bewegungs-Gate: Hat sich das Bild seit dem letzten Scan kaum verändert (Mini-Bild
+  64x36, mittlere absolute Differenz), wird das letzte Ergebnis wiederverwendet.
+- GPU-Anteil: Skalierung, Drehung und Graustufen-Wandlung (NV12 -> GRAY8) erledigt
+  bereits `nvvidconv` im NVMM-Speicher. Hier kommt nur das kleine Graubild an.
+  Die eigentliche Dekodierung bleibt auf der CPU (ZBar im eigenen Thread): Für
+  DeepStream (`nvinfer` + QR-Plugin, `pyds`) bzw. ein CUDA-fähiges OpenCV gibt es im
+  Projekt keine Abhängigkeiten.
+"""
+
+import os
+import threading
+import cv2
+import numpy as np
+from queue import LifoQueue, Queue, SimpleQueue, Empty, Full
+from pyzbar.pyzbar import decode as pyzbar_decode, Decoded, Point, Rect, ZBarSymbol
+from pyzbar.pyzbar_error import PyZbarError
+
+# Interne pyzbar-Namen für den wiederverwendeten Scanner (Stand pyzbar 0.1.9)
+try:
+    from pyzbar.pyzbar import _FOURCC, _decode_symbols, _image, _symbols_for_image
+    from pyzbar.wrapper import (
+        zbar_image_scanner_create, zbar_image_scanner_destroy, zbar_image_scanner_set_config,
+        zbar_image_set_format, zbar_image_set_size, zbar_image_set_data, zbar_scan_image,
+        ZBarConfig,
+    )
+    REUSABLE_SCANNER = True
+except ImportError:
+    REUSABLE_SCANNER = False # Rückfall auf pyzbar.decode(), siehe QRScanner
+
+from config import MOTION_GRID, MOTION_THRESHOLD, MOTION_REFRESH_FRAMES, QR_BACKEND, WECHAT_MODEL_DIR
+
+# Dateinamen der WeChat-Modelle (Detektor + Super-Resolution) in WECHAT_MODEL_DIR
+WECHAT_MODEL_FILES = ("detect.prototxt", "detect.caffemodel", "sr.prototxt", "sr.caffemodel")
+
+class QRScanner:
+    """Langlebiger ZBar-Scanner, der ausschließlich QR-Codes dekodiert."""
+
+    def __init__(self):
+        self._scanner = None
+        if not REUSABLE_SCANNER:
+            print("[QR] pyzbar-Interna nicht gefunden (Version != 0.1.9), nutze pyzbar.decode().")
+            return
+
+        self._scanner = zbar_image_scanner_create()
+        if not self._scanner:
+            raise PyZbarError('Could not create image scanner')
+
+        # Alle Symbologien deaktivieren (NONE = gilt für alle), dann nur QR aktivieren
+        zbar_image_scanner_set_config(self._scanner, ZBarSymbol.NONE, ZBarConfig.CFG_ENABLE, 0)
+        zbar_image_scanner_set_config(self._scanner, ZBarSymbol.QRCODE, ZBarConfig.CFG_ENABLE, 1)
+
+    def decode(self, gray):
+        """
+        Dekodiert alle QR-Codes in einem 8-Bit Graubild (NumPy-Array).
+        Rückgabe: Liste von `pyzbar.pyzbar.Decoded` (data, type, rect, polygon, ...).
+        """
+        if not REUSABLE_SCANNER:
+            return pyzbar_decode(gray, symbols=[ZBarSymbol.QRCODE])
+        if gray.ndim == 3:
+            gray = gray[:, :, 0] # Wie pyzbar: nur den ersten Kanal nutzen
+        # Kopiert nur, falls das Array nicht zusammenhängend im Speicher liegt
+        gray = np.ascontiguousarray(gray, dtype=np.uint8)
+        height, width = gray.shape
+
+        with _image() as img:
+            zbar_image_set_format(img, _FOURCC['L800'])
+            zbar_image_set_size(img, width, height)
+            # Pointer auf den NumPy-Puffer, 'gray' bleibt bis zum Ende des Scans referenziert
+            zbar_image_set_data(img, gray.ctypes.data, gray.nbytes, None)
+            if zbar_scan_image(self._scanner, img) < 0:
+                raise PyZbarError('Unsupported image format')
+            return list(_decode_symbols(_symbols_for_image(img)))
+
+    def close(self):
+        """Gibt den ZBar-Scanner frei."""
+        if self._scanner:
+            zbar_image_scanner_destroy(self._scanner)
+            self._scanner = None
+
+def _make_decoded(data, rect, polygon):
+    """Baut ein `Decoded`-Tupel passend zur installierten pyzbar-Version (Felder variieren)."""
+    values = dict(data=data, type='QRCODE', rect=rect, polygon=polygon, quality=1, orientation=None)
+    return Decoded(*(values[field] for field in Decoded._fields))
+
+class WeChatScanner:
+    """
+    Langlebiger WeChatQRCode-Decoder (opencv-contrib) mit derselben Schnittstelle wie QRScanner.
+    Ohne Modell-Ordner arbeitet er mit dem klassischen Detektor statt dem CNN.
+    """
+
+    def __init__(self, model_dir=None):
+        if model_dir:
+            self._detector = cv2.wechat_qrcode_WeChatQRCode(
+                *(os.path.join(model_dir, name) for name in WECHAT_MODEL_FILES))
+        else:
+            self._detector = cv2.wechat_qrcode_WeChatQRCode()
+
+    def decode(self, gray):
+        """
+        Dekodiert alle QR-Codes in einem 8-Bit Graubild (NumPy-Array).
+        Rückgabe: Liste von `pyzbar.pyzbar.Decoded` (Rechteck = Hülle der Eckpunkte, wie bei ZBar).
+        """
+        texts, corners = self._detector.detectAndDecode(gray)
+        results = []
+        for text, pts in zip(texts, corners):
+            polygon = [Point(int(x), int(y)) for x, y in pts.reshape(-1, 2)]
+            xs = [p.x for p in polygon]
+            ys = [p.y for p in polygon]
+            rect = Rect(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+            results.append(_make_decoded(text.encode('utf-8'), rect, polygon))
+        return results
+
+    def close(self):
+        """Gibt den Decoder frei."""
+        self._detector = None
+
+def create_fast_scanner():
+    """
+    Erstellt den zusätzlichen Decoder gemäß QR_BACKEND.
+    Rückgabe: WeChatScanner oder None (nur ZBar).
+    """
+    if QR_BACKEND != "wechat":
+        return None
+    if not hasattr(cv2, "wechat_qrcode_WeChatQRCode"):
+        print("[QR] WeChatQRCode nicht verfügbar (opencv-contrib fehlt), nutze ZBar.")
+        return None
+    return WeChatScanner(WECHAT_MODEL_DIR)
+
+def parse_detections(decoded_objects, inv_scale=1.0, offset=(0, 0)):
+    """
+    Wandelt ZBar-Ergebnisse in die Listen um, die `QRManager.process` erwartet.
+    Koordinaten werden um `offset` (Ursprung der ROI im dekodierten Bild) verschoben
+    und mit `inv_scale` auf die Originalauflösung hochskaliert.
+    Rückgabe: (codes, boxes, points)
+    """
+    off_x, off_y = offset
+    found_codes = []
+    found_boxes = []
+    found_points = []
+
+    # Ganzzahliger Faktor (z.B. 2 bei SCALE_FACTOR=0.5) -> reine Integer-Multiplikation
+    int_scale = int(inv_scale) if inv_scale == int(inv_scale) else None
+
+    for obj in decoded_objects:
+        qr_data = obj.data.decode('utf-8')
+        (x, y, w, h) = obj.rect
+        x += off_x
+        y += off_y
+
+        # Koordinaten auf Originalgröße hochskalieren
+        box = (int(x*inv_scale), int(y*inv_scale), int(w*inv_scale), int(h*inv_scale))
+
+        # Eckpunkte direkt als int32-Array (ZBar liefert ganzzahlige Pixel-Koordinaten)
+        np_pts = None
+        if obj.polygon:
+            poly = np.array(obj.polygon, dtype=np.int32)
+            if off_x or off_y:
+                poly += (off_x, off_y)
+            if int_scale is not None:
+                poly *= int_scale
+            else:
+                poly = (poly * inv_scale).astype(np.int32)
+            np_pts = poly.reshape((-1, 1, 2))
+
+        found_codes.append(qr_data)
+        found_boxes.append(box)
+        found_points.append(np_pts)
+
+    return found_codes, found_boxes, found_points
+
+class QRWorker(threading.Thread):
+    """
+    Decoder-Thread: Nimmt Graubilder per `submit()` entgegen und stellt das jeweils
+    neueste Ergebnis über `getResult()` bereit.
+    """
+
+    def __init__(self, inv_scale=1.0, offset=(0, 0)):
+        threading.Thread.__init__(self)
+        self.name = "QRWorker"
+        self.daemon = True
+        self.inv_scale = inv_scale
+        self.offset = offset # Ursprung der ROI im Kamerabild (siehe parse_detections)
+        self._running = True
+        self._frames = LifoQueue(maxsize=1)  # Eingang: nur der neueste Frame
+        self._results = Queue(maxsize=1)     # Ausgang: nur das neueste Ergebnis
+        self._free = SimpleQueue()           # Frei-Liste der Frame-Puffer (siehe submit)
+
+    def run(self):
+        scanner = QRScanner() # Im Worker-Thread anlegen (ZBar ist nicht thread-sicher)
+        fast_scanner = create_fast_scanner() # Optional, siehe QR_BACKEND
+        last_tiny = None
+        last_result = None
+        skipped = 0
+        try:
+            while self._running:
+                try:
+                    frame = self._frames.get(timeout=0.1)
+                except Empty:
+                    continue
+
+                # Bewegungs-Gate: Statisches Bild -> letztes Ergebnis wiederverwenden
+                tiny = cv2.resize(frame, MOTION_GRID, interpolation=cv2.INTER_AREA)
+                if (last_result is not None and skipped < MOTION_REFRESH_FRAMES
+                        and cv2.absdiff(tiny, last_tiny).mean() < MOTION_THRESHOLD):
+                    skipped += 1
+                    result = last_result
+                else:
+                    decoded = fast_scanner.decode(frame) if fast_scanner is not None else None
+                    if not decoded:
+                        decoded = scanner.decode(frame) # ZBar als Standard bzw. Rückfallebene
+                    result = parse_detections(decoded, self.inv_scale, self.offset)
+                    last_tiny, last_result, skipped = tiny, result, 0
+
+                self._free.put(frame) # Puffer wird nicht mehr gebraucht (Ergebnis ist kopiert)
+                self._put_latest(self._results, result)
+        finally:
+            scanner.close()
+            if fast_scanner is not None:
+                fast_scanner.close()
+
+    def _put_latest(self, queue, item):
+        """Ersetzt einen noch nicht abgeholten Eintrag durch den neuen."""
+        try:
+            queue.get_nowait()
+        except Empty:
+            pass
+        try:
+            queue.put_nowait(item)
+        except Full:
+            pass
+
+    def submit(self, frame):
+        """
+        Übergibt eine Kopie des Frames zur Dekodierung (blockiert nie, ältere Frames verfallen).
+        Der Aufrufer darf seinen Puffer danach sofort wiederverwenden.
+        """
+        try:
+            buf = self._free.get_nowait()
+            if buf.shape != frame.shape or buf.dtype != frame.dtype:
+                buf = np.empty_like(frame) # z.B. andere ROI: alten Puffer verwerfen
+        except Empty:
+            buf = np.empty_like(frame)
+        np.copyto(buf, frame)
+
+        # Noch nicht abgeholten Frame ersetzen, sein Puffer wird wieder frei
+        try:
+            self._free.put(self._frames.get_nowait())
+        except Empty:
+            pass
+        try:
+            self._frames.put_nowait(buf)
+        except Full:
+            self._free.put(buf)
+
+    def getResult(self):
+        """Liefert das neueste Ergebnis (codes, boxes, points) oder None, falls keins vorliegt."""
+        try:
+            return self._results.get_nowait()
+        except Empty:
+            return None
+
+    def stop(self):
+        self._running = False
@@ -11,6 +11,7 @@ der Datenbank-Schicht und der Anwendungslogik zu übergeben.
 Design-Notizen
 --------------
 - Leichtgewichtig: Enthält nur Datenfelder, keine komplexe Geschäftslogik.
+- __slots__: Nur die drei Datenfelder, kein `__dict__` pro Objekt.
 - Debugging-freundlich: Die `__repr__`-Methode sorgt dafür, dass Listen von Schränken
   in der Konsole lesbar ausgegeben werden, statt nur Speicheradressen anzuzeigen.
 """
@@ -20,6 +21,9 @@ class Schrank:
     Eine einfache Klasse, die einen Schrank (Inventar-Objekt) repräsentiert.
     Spiegelt im Wesentlichen eine Zeile der Datenbank-Tabelle 'schraenke' wider.
     """
+
+    # Feste Attribute statt __dict__ (weniger Speicher pro Objekt)
+    __slots__ = ("ware", "erscheinungspunkt", "abgangspunkt")
     
     def __init__(self, ware, erscheinungspunkt, abgangspunkt):
         """
@@ -12,16 +12,74 @@ Diese Datei fungiert als Brücke zwischen der Computer-Vision-Logik und der Date
 Design-Notizen
 --------------
 - Entkopplung: Der Tracking-Loop (Vision) muss nicht wissen, wie die Datenbank funktioniert. Er ruft nur diese API auf.
-- Konsistenz: Verwendet eine zentrale Helper-Funktion für Zeitstempel, um das Format (YYYY-MM-DD HH:MM:SS) überall gleich zu halten.
-- Sicherheit: Prüft vor jedem Schreibvorgang den aktuellen Datenbank-Status, um Überschreibungen zu vermeiden.
+- Konsistenz: Den Zeitstempel setzt `db.touch_schranks` selbst, im einheitlichen Format (YYYY-MM-DD HH:MM:SS).
+- Sicherheit: Zeitstempel werden per SQL nur gesetzt, wenn das Feld leer ist (COALESCE),
+  ein vorhandener Wert wird also nie überschrieben.
+- Batching: `schrank_batch_update` verarbeitet alle Ereignisse eines Frames in einer einzigen
+  Schreib-Transaktion (`db.touch_schranks`), statt zwei DB-Zugriffen pro Ereignis.
+- Logging statt print: Statusänderungen als INFO, die reinen Eingangs-Ereignisse als DEBUG
+  (der Tracker meldet sie bereits selbst), fehlende IDs als WARNING. Den vorherigen Stand
+  (ein SELECT pro ID) liest die Datenbank nur, wenn INFO-Meldungen auch ausgegeben werden.
 """
 
-from database import DatabaseManager
-from datetime import datetime
+import logging
+from database import get_default_db
 
-def _get_current_timestamp():
-    """Helper-Funktion für einen sauberen, einheitlichen Zeitstempel-String."""
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+logger = logging.getLogger(__name__)
+
+def schrank_batch_update(seen_ids=(), lost_ids=()):
+    """
+    Verarbeitet alle Ereignisse eines Frames gesammelt (eine Schreib-Transaktion).
+
+    Argumente:
+    - seen_ids: IDs, deren QR-Code (wieder) erkannt wurde (Logik siehe schrank_gesehen).
+    - lost_ids: IDs, deren QR-Code nicht mehr gesehen wird (Logik siehe schrank_verloren).
+    """
+    if not seen_ids and not lost_ids:
+        return
+    # Prozessweiter Manager: kein neuer Verbindungsaufbau pro Ereignis
+    db = get_default_db()
+
+    # 1. Alle Änderungen in einer Transaktion schreiben. Den vorherigen Stand (nur fürs
+    #    Logging) nur abfragen, wenn die Meldungen auch ausgegeben werden.
+    log_changes = logger.isEnabledFor(logging.INFO)
+    current = db.touch_schranks(seen_ids, lost_ids, with_previous=log_changes)
+    if current is None:
+        return # Fehler wurde bereits von der Datenbank gemeldet
+    if not log_changes:
+        return
+
+    # 2. Gesehene Schränke
+    for schrank_id in seen_ids:
+        logger.debug("[Tracking API] GESEHEN: ID %s", schrank_id)
+        current_data = current.get(schrank_id)
+        if current_data is None:
+            logger.warning("[Tracking API] FEHLER: ID %s nicht in DB gefunden.", schrank_id)
+            continue
+
+        # Fall A: Der Schrank wird zum allerersten Mal gesehen
+        if current_data['erscheinungspunkt'] is None:
+            logger.info("[Tracking API] ID %s zum ERSTEN Mal erfasst.", schrank_id)
+
+        # Fall B: Der Schrank war weg (hatte Abgangszeit) und ist jetzt wieder da
+        if current_data['abgangspunkt'] is not None:
+            # Die Abgangszeit wurde gelöscht, da er wieder anwesend ist
+            logger.info("[Tracking API] ID %s ist ZURÜCKgekehrt. Abgangszeit gelöscht.", schrank_id)
+
+        # Info: Wenn beides nicht zutrifft, ist der Schrank einfach weiterhin da
+
+    # 3. Verlorene Schränke
+    for schrank_id in lost_ids:
+        logger.debug("[Tracking API] VERLOREN: ID %s", schrank_id)
+        current_data = current.get(schrank_id)
+        if current_data is None:
+            logger.warning("[Tracking API] FEHLER: ID %s nicht in DB gefunden.", schrank_id)
+            continue
+
+        # Nur eingetragen, wenn er nicht bereits als "verloren" markiert war
+        if current_data['abgangspunkt'] is None:
+            logger.info("[Tracking API] ID %s als ABGEGANGEN markiert.", schrank_id)
+        # Sonst: bereits als abwesend markiert (im Normalbetrieb selten, der Manager filtert das)
 
 def schrank_gesehen(schrank_id):
     """
@@ -31,36 +89,7 @@ def schrank_gesehen(schrank_id):
     1. Wenn 'erscheinungspunkt' leer ist: Setze ihn (Erster Scan / Registrierung).
     2. Wenn 'abgangspunkt' gesetzt ist: Leere ihn (Der Schrank ist zurückgekehrt/Wiederaufnahme).
     """
-    print(f"[Tracking API] GESEHEN: ID {schrank_id}")
-    db = DatabaseManager()
-    
-    # 1. Aktuellen Status aus der Datenbank holen
-    current_data = db.get_schrank_by_id(schrank_id)
-    if not current_data:
-        print(f"[Tracking API] FEHLER: ID {schrank_id} nicht in DB gefunden.")
-        return
-
-    # 2. Status ermitteln
-    is_erster_scan = (current_data['erscheinungspunkt'] is None)
-    ist_zurueckgekehrt = (current_data['abgangspunkt'] is not None)
-
-    # 3. Fallunterscheidung und Updates
-    
-    # Fall A: Der Schrank wird zum allerersten Mal gesehen
-    if is_erster_scan:
-        timestamp = _get_current_timestamp()
-        db.update_erscheinungszeit(schrank_id, timestamp)
-        print(f"[Tracking API] ID {schrank_id} zum ERSTEN Mal erfasst um {timestamp}.")
-
-    # Fall B: Der Schrank war weg (hatte Abgangszeit) und ist jetzt wieder da
-    if ist_zurueckgekehrt:
-        # Wir löschen die Abgangszeit, da er wieder anwesend ist
-        db.update_abgangszeit(schrank_id, None)
-        print(f"[Tracking API] ID {schrank_id} ist ZURÜCKgekehrt. Abgangszeit gelöscht.")
-        
-    # Info: Wenn beides nicht zutrifft, ist der Schrank einfach weiterhin da
-    if not is_erster_scan and not ist_zurueckgekehrt:
-        pass # print(f"[Tracking API] ID {schrank_id} ist bereits als anwesend markiert.")
+    schrank_batch_update(seen_ids=[schrank_id])
 
 def schrank_verloren(schrank_id):
     """
@@ -71,20 +100,4 @@ def schrank_verloren(schrank_id):
     1. Trägt die Abgangszeit ein, ABER nur, wenn sie noch leer ist.
        So wird verhindert, dass der erste Zeitstempel des Verschwindens überschrieben wird.
     """
-    print(f"[Tracking API] VERLOREN: ID {schrank_id}")
-    db = DatabaseManager()
-
-    # 1. Aktuellen Status holen
-    current_data = db.get_schrank_by_id(schrank_id)
-    if not current_data:
-        print(f"[Tracking API] FEHLER: ID {schrank_id} nicht in DB gefunden.")
-        return
-
-    # 2. Nur eintragen, wenn er nicht bereits als "verloren" markiert ist
-    if current_data['abgangspunkt'] is None:
-        timestamp = _get_current_timestamp()
-        db.update_abgangszeit(schrank_id, timestamp)
-        print(f"[Tracking API] ID {schrank_id} als ABGEGANGEN markiert um {timestamp}.")
-    else:
-        # Sollte im Normalbetrieb selten vorkommen, da der Manager das filtert
-        print(f"[Tracking API] ID {schrank_id} ist bereits als abwesend markiert.")
+    schrank_batch_update(lost_ids=[schrank_id])
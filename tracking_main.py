@@ -15,7 +15,10 @@ Diese Datei orchestriert die Erfassung und Verfolgung von Warenträgern:
 Design-Notizen
 --------------
 - Soft Real-Time: Der Loop läuft so schnell wie möglich. Datenbank-Schreibvorgänge 
-  sind jedoch gethrottled (z.B. alle 5 Sek), um IO-Blocking zu vermeiden.
+  sind jedoch gethrottled (z.B. alle 5 Sek) und pro Intervall in einer einzigen
+  Transaktion gebündelt, um IO-Blocking zu vermeiden.
+- Schreib-Thread: Die gesammelten Positionen übergibt der Loop per Queue an einen
+  Hintergrund-Thread, der sie speichert und protokolliert. Der Loop wartet nie auf die Festplatte.
 - Koordinaten-Transformation: Nutzt `cv2.perspectiveTransform` mit einer festen 
   Kalibrierungsmatrix, um die perspektivische Verzerrung der Kamera auszugleichen.
 - Robustheit: Fehlende Hardware oder fehlende Map-Dateien werden abgefangen, 
@@ -28,14 +31,16 @@ import cv2
 import numpy as np
 import argparse
 import sys
-from pyzbar.pyzbar import decode
-from collections import deque
+import threading
+import logging
+from queue import Queue
 
 # Eigene Module (Architektur-Schichten)
 import config
 from qr_logic import QRManager
-from gui import draw_overlay, draw_map_view 
-from database import DatabaseManager 
+from qr_scanner import QRWorker
+from gui import draw_overlay, MapRenderer
+from database import get_default_db
 
 # Hardware-Treiber
 from JetsonCamera import Camera
@@ -53,6 +58,54 @@ def sigint_handler(signum, frame):
 signal.signal(signal.SIGINT, sigint_handler)
 signal.signal(signal.SIGTERM, sigint_handler)
 
+def start_movement_writer(db):
+    """
+    Startet den Schreib-Thread für das Bewegungs-Log (Daemon-Thread).
+    Die Hauptschleife legt nur (uid, x, y)-Listen in die Queue. Speichern (eine
+    Transaktion pro Liste), Formatierung und print() laufen hier. `None` beendet den Thread.
+    Rückgabe: (queue, thread); vor db.close() auf den Thread warten.
+    """
+    log_queue = Queue()
+
+    def run():
+        while True:
+            batch = log_queue.get()
+            if batch is None: break
+            db.log_movement_bulk(batch)
+            print(f"[LOG] {len(batch)} Positionen gespeichert: " +
+                  ", ".join(f"ID {uid} -> {x}/{y}" for uid, x, y in batch))
+
+    thread = threading.Thread(target=run, name="MovementWriter", daemon=True)
+    thread.start()
+    return log_queue, thread
+
+class TrailBuffer:
+    """
+    Ringpuffer für den Tracer-Schweif eines Objekts (vorallokiertes int32-Array).
+
+    Jeder Punkt wird doppelt abgelegt (Index i und i + maxlen). Dadurch sind die
+    letzten `maxlen` Punkte immer ein zusammenhängender, chronologisch sortierter
+    Ausschnitt, der ohne Kopie an `cv2.polylines` übergeben werden kann.
+    """
+
+    def __init__(self, maxlen=50):
+        self.maxlen = maxlen
+        self._buf = np.zeros((2 * maxlen, 2), dtype=np.int32)
+        self._count = 0
+
+    def append(self, x, y):
+        i = self._count % self.maxlen
+        self._buf[i] = self._buf[i + self.maxlen] = (x, y)
+        self._count += 1
+
+    def __len__(self):
+        return min(self._count, self.maxlen)
+
+    def points(self):
+        """Liefert die gespeicherten Punkte als (N, 1, 2)-View (älteste zuerst)."""
+        start = self._count % self.maxlen if self._count >= self.maxlen else 0
+        return self._buf[start:start + len(self)].reshape(-1, 1, 2)
+
 def parse_cmdline():
     """Verarbeitet Kommandozeilenargumente."""
     parser = argparse.ArgumentParser(description='Track & TrAIce - Main Loop')
@@ -78,14 +131,28 @@ def get_calibration_matrix():
     ])
     return cv2.getPerspectiveTransform(src_points, dst_points)
 
-def transform_point(x, y, matrix):
+# Die Kalibrierung ändert sich zur Laufzeit nicht -> nur einmal berechnen
+CALIBRATION_MATRIX = get_calibration_matrix()
+
+def poll_key():
     """
-    Wendet die Perspektiv-Transformation auf einen einzelnen Punkt an.
-    Returns: (x, y) auf der Karte.
+    Fragt die Tastatur ab, ohne zu warten, und verarbeitet dabei die GUI-Events.
+    `cv2.pollKey` gibt es erst ab OpenCV 4.5 (JetPack liefert teils ältere Versionen),
+    dort wird auf die kürzeste Wartezeit mit `cv2.waitKey(1)` zurückgegriffen.
     """
-    pt = np.array([[[x, y]]], dtype=np.float32)
-    t_pt = cv2.perspectiveTransform(pt, matrix)
-    return int(t_pt[0][0][0]), int(t_pt[0][0][1])
+    return cv2.waitKey(1)
+
+if hasattr(cv2, "pollKey"):
+    poll_key = cv2.pollKey
+
+def transform_points(points, matrix):
+    """
+    Wendet die Perspektiv-Transformation auf alle Punkte in EINEM Aufruf an.
+    Argumente: points als Liste/Array von (x, y) Kamera-Koordinaten.
+    Returns: int32-Array der Form (N, 2) mit Karten-Koordinaten.
+    """
+    pts = np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+    return cv2.perspectiveTransform(pts, matrix).reshape(-1, 2).astype(np.int32)
 
 def main():
     """
@@ -99,12 +166,17 @@ def main():
     """
     print("\n--- STARTE TRACKING MIT LOGGING & TRACER ---\n")
     args = parse_cmdline()
+
+    # Ereignis-Meldungen von Tracking-Logik und API (logging) wie bisher auf der Konsole
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     
     # ---------- 1. Persistenz-Schicht (Datenbank) ----------
     try:
-        db = DatabaseManager()
+        # Derselbe Manager wie in tracking_api: eine Schreib-Verbindung für den ganzen Prozess
+        db = get_default_db()
         db.create_schrank_table()
         db.create_movement_table() 
+        db.start_checkpointer() # Hält das WAL im Dauerbetrieb klein
         print("[INIT] Datenbank verbunden und Tabellen geprüft.")
     except Exception as e:
         print(f"FATAL: Datenbankfehler: {e}")
@@ -113,7 +185,12 @@ def main():
     # ---------- 2. Hardware-Schicht Initialisierung ----------
     try:
         # Kamera initialisieren (GStreamer Pipeline intern)
-        camera = Camera(width=config.CAM_WIDTH, height=config.CAM_HEIGHT)
+        # Die GPU (nvvidconv) liefert direkt ein verkleinertes Graubild für den QR-Scan,
+        # bereits um 180 Grad gedreht (Montage an der Decke, flip-method=2)
+        camera = Camera(width=int(config.CAM_WIDTH * config.SCALE_FACTOR),
+                        height=int(config.CAM_HEIGHT * config.SCALE_FACTOR),
+                        gray=True,
+                        flip_method=2)
     except Exception as e:
         print(f"FATAL: Kamera konnte nicht gestartet werden: {e}")
         return
@@ -138,12 +215,13 @@ def main():
         return
 
     map_h, map_w = map_img.shape[:2]
-    matrix = get_calibration_matrix()
+    map_renderer = MapRenderer(map_img) # Zeichnet in einen wiederverwendeten Puffer
+    matrix = CALIBRATION_MATRIX
     
     print("[INIT] Warte auf Kamera-Einpegelung...")
     time.sleep(2)
     
-    qr_manager = QRManager(config.JSON_FILE)
+    qr_manager = QRManager(db)
 
     # Setup GUI-Fenster
     window_name = "Lagerbestand Tracking"
@@ -153,125 +231,155 @@ def main():
     # --- Laufzeit-Variablen (State) ---
     show_map_view = True
     show_tracer = True      
+    # Karte nur neu zeichnen, wenn sich etwas geändert hat (neues Ergebnis, Umschalten)
+    # oder eine neue Sekunde begonnen hat (Anzeige der Verweildauer)
+    map_dirty = True
+    last_map_second = None
     
     # Logging-Timer (Throttling, um DB nicht zu überfluten)
     last_log_time = time.time()
     LOG_INTERVAL = 5.0 # Sekunden
 
-    # Tracer-Speicher: Dictionary {ID -> Deque(Punkte)}
+    # Tracer-Speicher: Dictionary {ID -> TrailBuffer(Punkte)}
     # Speichert den Verlauf (Schweif) der letzten Bewegungen
     trails = {} 
 
+    # Tracking-Koordinaten beziehen sich auf die volle Kamera-Auflösung
+    width, height = config.CAM_WIDTH, config.CAM_HEIGHT
+    inv_scale = 1.0 / config.SCALE_FACTOR
+
+    # Scan-Bereich (ROI) in Koordinaten des verkleinerten Kamerabilds, None = ganzes Bild
+    if config.SCAN_ROI is not None:
+        roi_x0, roi_y0, roi_x1, roi_y1 = (int(v * config.SCALE_FACTOR) for v in config.SCAN_ROI)
+        scan_roi = (slice(roi_y0, roi_y1), slice(roi_x0, roi_x1))
+        roi_offset = (roi_x0, roi_y0)
+    else:
+        scan_roi = (slice(None), slice(None))
+        roi_offset = (0, 0)
+
+    # QR-Dekodierung läuft parallel zu Bildakquise und Zeichnen
+    qr_worker = QRWorker(inv_scale, roi_offset)
+    qr_worker.start()
+    active_entities = {}
+    live_entities = [] # Nur die aktiven Objekte, einmal pro Ergebnis gefiltert
+    map_points = []    # Deren Karten-Koordinaten, einmal pro Ergebnis transformiert
+    frame_counter = 0  # Für DECODE_EVERY (nur jeden N-ten Frame dekodieren)
+
+    # Speichern und Konsolenausgabe der Log-Einträge außerhalb der Hauptschleife
+    log_queue, log_writer = start_movement_writer(db)
+
     print("System bereit.")
     print(" [TAB] Ansicht wechseln | [T] Tracer An/Aus | [F] Autofokus | [Q] Beenden")
 
     # ========== Hauptschleife (Main Loop) ==========
     while not exit_:
         # 1. Bildakquise (Frame Grabbing)
+        # Bereits verkleinertes und gedrehtes Graubild, vorbereitet auf der GPU
         frame = camera.getFrame(2000)
         if frame is None: continue
-
-        # Drehung je nach Montage (180 Grad)
-        frame = cv2.rotate(frame, cv2.ROTATE_180)
-        height, width = frame.shape[:2]
         
         # 2. Perzeption (Wahrnehmung & Detektion)
-        # Downscaling beschleunigt die QR-Erkennung massiv
-        small_frame = cv2.resize(frame, (0, 0), fx=config.SCALE_FACTOR, fy=config.SCALE_FACTOR)
-        decoded_objects = decode(cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY))
-        
-        found_codes = []
-        found_boxes = []
-        found_points = []
-        inv_scale = 1.0 / config.SCALE_FACTOR
-
-        for obj in decoded_objects:
-            qr_data = obj.data.decode('utf-8')
-            (x, y, w, h) = obj.rect
-            
-            # Koordinaten auf Originalgröße hochskalieren
-            box = (int(x*inv_scale), int(y*inv_scale), int(w*inv_scale), int(h*inv_scale))
-            
-            pts = []
-            for p in obj.polygon: pts.append([int(p.x*inv_scale), int(p.y*inv_scale)])
-            np_pts = np.array(pts, dtype=np.int32).reshape((-1, 1, 2)) if pts else None
-
-            found_codes.append(qr_data)
-            found_boxes.append(box)
-            found_points.append(np_pts)
-
-        # 3. Logik-Verarbeitung (Tracking State Update)
-        # Verknüpft rohe Scans mit Objekt-IDs (Entprellung/Debouncing)
-        active_entities = qr_manager.process(found_codes, found_boxes, found_points, width, height)
-
-        # 4. Transformation & Logging (Mapping & Datenbank)
-        current_time = time.time()
-        should_log = (current_time - last_log_time) >= LOG_INTERVAL
-
-        for uid, entity in active_entities.items():
-            if not entity.active: continue
-
-            # Geometrischer Mittelpunkt der Box berechnen
-            bx, by, bw, bh = entity.box
-            cam_cx, cam_cy = bx + bw/2, by + bh # Fußpunkt (unten mitte) ist oft genauer
-
-            # Koordinaten-Transformation (Kamera -> Karte)
+        # Jeden N-ten Frame an den Decoder-Thread übergeben (blockiert nicht) und neuestes
+        # Ergebnis abholen. submit() kopiert in einen wiederverwendeten Puffer, denn der
+        # Kamera-Puffer wird zwei Frames später überschrieben.
+        # Kopiert wird nur der Scan-Bereich (ROI-View, ohne ROI das ganze Bild).
+        frame_counter += 1
+        if frame_counter % config.DECODE_EVERY == 0:
+            qr_worker.submit(frame[scan_roi])
+        detection = qr_worker.getResult()
+
+        # Ohne neues Ergebnis wird mit dem letzten Stand weiter gezeichnet
+        if detection is not None:
+            found_codes, found_boxes, found_points = detection
+
+            # 3. Logik-Verarbeitung (Tracking State Update)
+            # Verknüpft rohe Scans mit Objekt-IDs (Entprellung/Debouncing)
+            active_entities = qr_manager.process(found_codes, found_boxes, found_points, width, height)
+            map_dirty = True
+
+            # 4. Transformation & Logging (Mapping & Datenbank)
+            current_time = time.time()
+            should_log = (current_time - last_log_time) >= LOG_INTERVAL
+            log_batch = [] # Sammelt (uid, x, y) für einen einzigen DB-Schreibvorgang
+
+            # Fußpunkte (unten mitte) aller aktiven Objekte sammeln -> ist oft genauer als der Mittelpunkt
+            live_entities = [entity for entity in active_entities.values() if entity.active]
+            cam_points = [(e.box[0] + e.box[2]/2, e.box[1] + e.box[3]) for e in live_entities]
+
+            # Koordinaten-Transformation (Kamera -> Karte), ein Aufruf für alle Objekte
             try:
-                map_x, map_y = transform_point(cam_cx, cam_cy, matrix)
-                
+                map_points = transform_points(cam_points, matrix).tolist() if cam_points else []
+            except Exception as e:
+                map_points = [] # Transformationsfehler ignorieren
+
+            for entity, (map_x, map_y) in zip(live_entities, map_points):
+                uid = entity.uid
                 # A) Visualisierungspfad (Tracer) aktualisieren
                 if uid not in trails:
-                    trails[uid] = deque(maxlen=50) # Maximale Schweif-Länge
-                trails[uid].append((map_x, map_y))
+                    trails[uid] = TrailBuffer(maxlen=50) # Maximale Schweif-Länge
+                trails[uid].append(map_x, map_y)
 
-                # B) Datenbank-Logging (Zeitgesteuert)
+                # B) Datenbank-Logging (Zeitgesteuert, gesammelt)
                 if should_log:
                     # Plausibilitätscheck: Ist Punkt auf der Karte?
                     if 0 <= map_x < map_w and 0 <= map_y < map_h:
-                        db.log_movement(uid, map_x, map_y)
-                        print(f"[LOG] ID {uid} -> Pos: {map_x}/{map_y}")
+                        log_batch.append((uid, map_x, map_y))
 
-            except Exception as e:
-                pass # Transformationsfehler ignorieren (Punkt außerhalb)
-
-        if should_log:
-            last_log_time = current_time
+            if should_log:
+                # Alle Positionen in einer Transaktion schreiben (ein Commit statt N),
+                # im Schreib-Thread (blockiert die Schleife nicht)
+                if log_batch:
+                    log_queue.put(log_batch)
+                last_log_time = current_time
 
         # 5. Visualisierung (GUI Rendering)
         if show_map_view:
-            final_image = draw_map_view(map_img, active_entities, matrix)
-            
-            # Tracer (Schweif) einzeichnen
-            if show_tracer:
-                for uid, trail in trails.items():
-                    # Nur zeichnen, wenn Objekt aktiv ist
-                    if uid in active_entities and active_entities[uid].active:
-                        pts = np.array(trail, np.int32).reshape((-1, 1, 2))
-                        cv2.polylines(final_image, [pts], False, (255, 0, 0), 2) 
+            # Unveränderte Karte: Fenster behält das letzte Bild (kein Zeichnen, kein imshow)
+            current_second = int(time.time())
+            if map_dirty or current_second != last_map_second:
+                # Tracer (Schweif) nur für aktive Objekte, wird vom Renderer mitgezeichnet
+                active_trails = []
+                if show_tracer:
+                    active_trails = [trails[e.uid].points() for e in live_entities if e.uid in trails]
+                # Karten-Koordinaten stammen aus Schritt 4 (keine erneute Transformation pro Frame)
+                final_image = map_renderer.render(active_entities, matrix, active_trails, live_entities,
+                                                  map_points or None)
+                cv2.imshow(window_name, final_image)
+                map_dirty = False
+                last_map_second = current_second
         else:
-            draw_overlay(frame, width, height, active_entities)
-            final_image = frame
-
-        cv2.imshow(window_name, final_image)
+            # Kamera-Ansicht: Overlay direkt im verkleinerten Graubild (skalierte Koordinaten),
+            # keine Kopie in voller Auflösung. Das Fenster skaliert die Anzeige selbst.
+            overlay_frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+            draw_overlay(overlay_frame, width, height, active_entities, config.SCALE_FACTOR)
+            cv2.imshow(window_name, overlay_frame)
         
         # 6. User Input Handling
-        key = cv2.waitKey(1) & 0xFF
+        # Ohne Wartezeit: Den Takt gibt die Kamera vor (getFrame blockiert bis zum nächsten Frame)
+        key = poll_key() & 0xFF
         if key == ord('q'): break
         elif key == 9: # TAB-Taste
             show_map_view = not show_map_view
+            map_dirty = True
         elif key == ord('f'): 
             print("[CMD] Autofokus angefordert...")
             focusState.reset()
             doFocus(camera, focuser, focusState)
         elif key == ord('t'): 
             show_tracer = not show_tracer
+            map_dirty = True
             print(f"[CMD] Tracer: {'AN' if show_tracer else 'AUS'}")
         elif key == ord('l'): 
             last_log_time = 0 # Erzwingt sofortiges Loggen beim nächsten Frame
 
     # Aufräumen (Resource Cleanup)
     print("[SYSTEM] Beende Kamera und Fenster...")
+    qr_worker.stop()
+    qr_manager.close() # Letzten Live-Status noch schreiben
+    log_queue.put(None)
+    log_writer.join() # Letzte Positionen noch speichern
     camera.close()
+    db.close()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
@@ -12,16 +12,30 @@ Diese Datei stellt den Web-Zugriffspunkt für das System bereit:
 Design-Notizen
 --------------
 - Micro-Framework: Nutzt Flask für einen leichtgewichtigen HTTP-Server.
+- Produktions-Server: `start_server()` nutzt 'waitress' (mehrere Threads), falls installiert.
+  Der Flask-Debug-Server (Debugger, ein Prozess zum Entwickeln) wird nicht mehr verwendet.
 - Server-Side Rendering: Generiert einfaches HTML direkt im Code (keine externen Templates nötig).
 - Netzwerk-Sichtbarkeit: Läuft auf '0.0.0.0', damit der Server auch von anderen Geräten im WLAN (z.B. Handy) erreichbar ist.
 - Fehlerbehandlung: Fängt nicht vorhandene IDs (404) und Datenbank-Fehler (500) sauber ab.
+- Seiten-Cache: Die fertige HTML-Seite wird pro ID für `PAGE_CACHE_TTL` Sekunden im
+  Speicher gehalten (LRU). Änderungen des Trackers erscheinen also spätestens nach dieser Zeit.
 """
 
+import time
+from functools import lru_cache
 from flask import Flask, abort
-from database import DatabaseManager
+from database import get_default_db
 
 app = Flask(__name__)
 
+# [Sekunden] So lange wird eine Detail-Seite zwischengespeichert. Die Seite lädt sich
+# selbst alle 5 s neu, viele Handys lösen so höchstens einen DB-Zugriff pro Sekunde aus.
+PAGE_CACHE_TTL = 1.0
+PAGE_CACHE_SIZE = 256
+
+# Worker-Threads des Produktions-Servers (waitress), Lesezugriffe laufen parallel (WAL)
+SERVER_THREADS = 8
+
 # WICHTIG: Keine eigene DB_FILE Konstante definieren, die falsch ist.
 # Wir verlassen uns auf den Default in DatabaseManager, um Konsistenz zu wahren.
 
@@ -30,6 +44,65 @@ def index():
     """Startseite / Landing Page."""
     return "Willkommen beim Schrank-Inventar-System. Scanne einen QR-Code."
 
+def _render_schrank_page(schrank_id, time_bucket):
+    """
+    Liest einen Schrank und baut die Detail-Seite (HTML).
+    Rückgabe: HTML-String oder None, falls die ID nicht existiert.
+
+    `time_bucket` dient nur als Cache-Schlüssel (siehe PAGE_CACHE_TTL).
+    """
+    # ---------- 1. Datenbeschaffung ----------
+    # Gemeinsamer Manager für 'Schrank_Bestand.db' (Verbindungen werden wiederverwendet)
+    db_manager = get_default_db()
+    schrank_data = db_manager.get_schrank_by_id(schrank_id)
+    if not schrank_data:
+        return None
+
+    # ---------- 2. HTML-Generierung ----------
+    # Daten für die Anzeige aufbereiten
+    ware_val = schrank_data['ware']
+    # Sicherstellen, dass None (Leere Werte) als Striche "---" angezeigt wird
+    erschien_val = schrank_data['erscheinungspunkt'] or "---"
+    abgang_val = schrank_data['abgangspunkt'] or "---"
+
+    # Einfaches HTML-Template mit eingebetteten CSS-Styles
+    # Der meta-refresh sorgt dafür, dass sich die Seite alle 5 Sekunden neu lädt
+    html_output = f"""
+    <html>
+    <head>
+        <title>Schrank Details</title>
+        <meta http-equiv="refresh" content="5"> 
+        <style>
+            body {{ font-family: sans-serif; padding: 20px; background-color: #f4f4f4; }}
+            .container {{ 
+                border: 1px solid #ccc; 
+                padding: 20px; 
+                max-width: 600px; 
+                background-color: white; 
+                box-shadow: 2px 2px 10px rgba(0,0,0,0.1);
+                margin: 0 auto;
+            }}
+            h1 {{ color: #333; }}
+            p {{ font-size: 1.1em; line-height: 1.5; }}
+        </style>
+    </head>
+    <body>
+        <div class='container'>
+            <h1>Schrank ID: {schrank_data['id']}</h1>
+            <hr>
+            <p><strong>Ware:</strong> {ware_val}</p>
+            <p><strong>Erstes Erscheinen:</strong> {erschien_val}</p>
+            <p><strong>Letzter Abgang:</strong> {abgang_val}</p>
+        </div>
+    </body>
+    </html>
+    """
+    return html_output
+
+# Seiten-Cache: Schlüssel (ID, Zeitfenster). Abgelaufene Zeitfenster werden nie mehr
+# angefragt und fallen nach und nach aus dem LRU-Cache.
+_cached_schrank_page = lru_cache(maxsize=PAGE_CACHE_SIZE)(_render_schrank_page)
+
 @app.route('/schrank/<int:schrank_id>')
 def get_schrank_details(schrank_id):
     """
@@ -41,70 +114,34 @@ def get_schrank_details(schrank_id):
     print(f"Anfrage für Schrank ID {schrank_id} empfangen...")
     
     try:
-        # ---------- 1. Datenbeschaffung ----------
-        # Hier KEIN Argument übergeben, damit er automatisch 'Schrank_Bestand.db' nimmt
-        db_manager = DatabaseManager()
-        schrank_data = db_manager.get_schrank_by_id(schrank_id)
-        
-        # ---------- 2. HTML-Generierung ----------
-        if schrank_data:
-            # Daten für die Anzeige aufbereiten
-            ware_val = schrank_data['ware']
-            # Sicherstellen, dass None (Leere Werte) als Striche "---" angezeigt wird
-            erschien_val = schrank_data['erscheinungspunkt'] or "---"
-            abgang_val = schrank_data['abgangspunkt'] or "---"
-
-            # Einfaches HTML-Template mit eingebetteten CSS-Styles
-            # Der meta-refresh sorgt dafür, dass sich die Seite alle 5 Sekunden neu lädt
-            html_output = f"""
-            <html>
-            <head>
-                <title>Schrank Details</title>
-                <meta http-equiv="refresh" content="5"> 
-                <style>
-                    body {{ font-family: sans-serif; padding: 20px; background-color: #f4f4f4; }}
-                    .container {{ 
-                        border: 1px solid #ccc; 
-                        padding: 20px; 
-                        max-width: 600px; 
-                        background-color: white; 
-                        box-shadow: 2px 2px 10px rgba(0,0,0,0.1);
-                        margin: 0 auto;
-                    }}
-                    h1 {{ color: #333; }}
-                    p {{ font-size: 1.1em; line-height: 1.5; }}
-                </style>
-            </head>
-            <body>
-                <div class='container'>
-                    <h1>Schrank ID: {schrank_data['id']}</h1>
-                    <hr>
-                    <p><strong>Ware:</strong> {ware_val}</p>
-                    <p><strong>Erstes Erscheinen:</strong> {erschien_val}</p>
-                    <p><strong>Letzter Abgang:</strong> {abgang_val}</p>
-                </div>
-            </body>
-            </html>
-            """
-            return html_output
-        else:
-            # Fall: ID existiert nicht in der Datenbank
-            print(f"Schrank ID {schrank_id} nicht gefunden.")
-            abort(404, description="Schrank nicht gefunden")
-            
+        html_output = _cached_schrank_page(schrank_id, int(time.time() / PAGE_CACHE_TTL))
     except Exception as e:
         print(f"Server-Fehler: {e}")
         abort(500, description="Interner Serverfehler")
 
+    if html_output is None:
+        # Fall: ID existiert nicht in der Datenbank
+        # (außerhalb des try-Blocks, sonst würde aus dem 404 ein 500)
+        print(f"Schrank ID {schrank_id} nicht gefunden.")
+        abort(404, description="Schrank nicht gefunden")
+    return html_output
+
 def start_server():
     """
-    Startet den Flask-Server.
+    Startet den Server.
     
     Parameter:
     - host='0.0.0.0': Erlaubt Zugriff von außen (z.B. Handy im gleichen WLAN).
+    - Ist 'waitress' installiert, läuft die App dort mit SERVER_THREADS Worker-Threads.
+      Sonst Fallback auf den Flask-Server: ohne Debugger, ein Thread pro Anfrage.
     - use_reloader=False: Verhindert doppelte Ausführung bei manchen IDEs/Setups.
     """
-    app.run(debug=True, port=5000, use_reloader=False, host='0.0.0.0')
+    try:
+        from waitress import serve # Optionale Abhängigkeit
+    except ImportError:
+        app.run(debug=False, threaded=True, port=5000, use_reloader=False, host='0.0.0.0')
+        return
+    serve(app, host='0.0.0.0', port=5000, threads=SERVER_THREADS)
 
 if __name__ == "__main__":
     start_server()